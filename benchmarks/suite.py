@@ -0,0 +1,185 @@
+"""盤面サイズ×バックエンド×戦略のベンチマーク。
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 0.2
+
+結果はJSONで出し、--baselineを渡すと前回の結果と比べて遅くなったものを表示して終了コード1で終わる。
+シードは固定で、計測の前にウォームアップする。値は繰り返した中の中央値。
+"""
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+from typing import Callable, TypedDict
+
+from src.game import GameModel
+from src.sizes import parse_sizes
+from src.stage import InvaderStage
+from src.strategies import create_strategy, strategy_names
+from src.type.abstracts import BaseGameStage, BasePlayerStrategy
+
+SEED = 12345
+DEFAULT_SIZES = [(80, 24), (160, 48), (320, 96), (1000, 300), (4000, 1000)]
+
+# 盤面をコピーして探索する戦略は、1回の判断だけでも予算を大きく超えるので大きな盤面では測らない
+DECIDE_MAX_CELLS: dict[str, int] = {"Lookahead": 320 * 96}
+
+
+class Measurement(TypedDict):
+    value: float
+    unit: str
+    higher_is_better: bool
+
+
+def stage_classes() -> dict[str, type[BaseGameStage]]:
+    classes: dict[str, type[BaseGameStage]] = {"object": InvaderStage}
+    try:
+        from src.swarm import SwarmInvaderStage
+    except ImportError:
+        pass
+    else:
+        classes["swarm"] = SwarmInvaderStage
+    return classes
+
+
+def _run_steps(game: GameModel, strategy: Callable, steps: int) -> None:
+    for _ in range(steps):
+        if game.is_game_over:
+            game.initialize_game(SEED)
+        game.emuration_step(strategy)
+
+
+def bench_step(stage_class: type[BaseGameStage], size: tuple[int, int], steps: int, repeat: int) -> Measurement:
+    """GameModel.emuration_stepのスループット(1ステップおきに撃つ戦略で弾も動かす)"""
+    game = GameModel(stage_class(size))
+    strategy = create_strategy("Midareuti")
+    rates = []
+    for _ in range(repeat):
+        game.initialize_game(SEED)
+        strategy.reset()
+        _run_steps(game, strategy.decide_action, max(1, steps // 10))  # ウォームアップ
+        started = perf_counter()
+        _run_steps(game, strategy.decide_action, steps)
+        rates.append(steps / (perf_counter() - started))
+    return {"value": median(rates), "unit": "steps/sec", "higher_is_better": True}
+
+
+def bench_init(stage_class: type[BaseGameStage], size: tuple[int, int], repeat: int) -> Measurement:
+    """InvaderStage.enemy_initializationを含むステージのリセットにかかる時間"""
+    game = GameModel(stage_class(size))
+    times = []
+    for _ in range(repeat + 1):
+        started = perf_counter()
+        game.initialize_game(SEED)
+        times.append(perf_counter() - started)
+    # 1回目はウォームアップとして捨てる
+    return {"value": median(times[1:]) * 1e3, "unit": "ms", "higher_is_better": False}
+
+
+def bench_decide(strategy: BasePlayerStrategy, size: tuple[int, int], decisions: int, budget: float) -> Measurement:
+    """実際にゲームを進めながら測ったdecide_actionの1回あたりの時間(中央値)。
+    budget秒を過ぎたら、最初の1回が終わった時点でも打ち切る。
+    """
+    game = GameModel(InvaderStage(size))
+    game.initialize_game(SEED)
+    strategy.reset()
+    times = []
+    started = perf_counter()
+    while len(times) < decisions and (not times or perf_counter() - started < budget):
+        if game.is_game_over:
+            game.initialize_game(SEED)
+            strategy.reset()
+        decide_started = perf_counter()
+        action = strategy.decide_action(game.gamestate)
+        times.append(perf_counter() - decide_started)
+        game.step(action)
+    # 最初の数回はウォームアップとして捨てる
+    return {"value": median(times[len(times) // 10:]) * 1e6, "unit": "us", "higher_is_better": False}
+
+
+def run_suite(
+    sizes: list[tuple[int, int]],
+    steps: int = 200,
+    repeat: int = 3,
+    decisions: int = 200,
+    budget: float = 2.0,
+) -> dict[str, Measurement]:
+    results: dict[str, Measurement] = {}
+    for width, height in sizes:
+        size_name = f"{width}x{height}"
+        for backend, stage_class in stage_classes().items():
+            # 巨大な盤面を1体ずつ動かすのは遅いので、ステップ数を減らす
+            size_steps = steps if backend != "object" or width * height <= 320 * 96 else max(10, steps // 10)
+            results[f"init/{backend}/{size_name}"] = bench_init(stage_class, (width, height), repeat)
+            results[f"step/{backend}/{size_name}"] = bench_step(stage_class, (width, height), size_steps, repeat)
+            print(f"{backend} {size_name}: done", file=sys.stderr)
+
+        for name in strategy_names():
+            if width * height > DECIDE_MAX_CELLS.get(name, width * height):
+                continue
+            results[f"decide/{name}/{size_name}"] = bench_decide(
+                create_strategy(name), (width, height), decisions, budget
+            )
+        print(f"strategies {size_name}: done", file=sys.stderr)
+
+    return results
+
+
+def compare(results: dict[str, Measurement], baseline: dict[str, Measurement], threshold: float) -> list[str]:
+    """baselineよりthreshold以上悪くなったものを返す"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or base["value"] <= 0 or result["value"] <= 0:
+            continue
+        ratio = result["value"] / base["value"]
+        slower = ratio < 1 - threshold if result["higher_is_better"] else ratio > 1 + threshold
+        if slower:
+            regressions.append(
+                f"{name}: {base['value']:.1f} -> {result['value']:.1f} {result['unit']} ({ratio - 1:+.1%})"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the game engine and strategies.")
+    parser.add_argument("--sizes", type=parse_sizes, default=DEFAULT_SIZES)
+    parser.add_argument("--steps", type=int, default=200, help="Measured steps per repeat.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--decisions", type=int, default=200, help="Measured decide_action calls per strategy.")
+    parser.add_argument("--budget", type=float, default=2.0, help="Seconds allowed per strategy and size.")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON.")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare with a previous JSON output.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging.")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.steps, args.repeat, args.decisions, args.budget)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    for name, result in results.items():
+        print(f"{name}: {result['value']:.1f} {result['unit']}", file=sys.stderr)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file)["results"], args.threshold)
+        if regressions:
+            print("Regressions:", file=sys.stderr)
+            for regression in regressions:
+                print(f"- {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions.", file=sys.stderr)
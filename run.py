@@ -1,34 +1,36 @@
-from argparse import ArgumentParser
+"""以前からのオプション形式の入口。モードを選ぶオプションを `python -m src` のサブコマンドに読み替えて渡す。
 
-from src.main import main
-from src.player import player_strategys
+    python run.py --headless --games 100    → python -m src simulate --games 100
+    python run.py --tournament --games 100  → python -m src tournament --games 100
+    python run.py --replay game.rep         → python -m src replay game.rep
+    python run.py --compare                 → python -m src play --compare
+    python run.py                           → python -m src play
+"""
+import sys
 
-from asciimatics.screen import Screen
+from src.__main__ import main
+
+# モードを選ぶオプション → サブコマンド。複数あれば先にあるものを使う
+MODES = {"--replay": "replay", "--tournament": "tournament", "--headless": "simulate"}
+
+
+def to_subcommand(argv: list[str]) -> list[str]:
+    modes: dict[str, str] = {}
+    replay_file: list[str] = []
+    rest: list[str] = []
+    args = iter(argv)
+    for arg in args:
+        name, equals, value = arg.partition("=")
+        if name not in MODES:
+            rest.append(arg)
+            continue
+        modes[name] = MODES[name]
+        if name == "--replay":
+            replay_file = [value] if equals else [next(args, "")]
+
+    command = next((modes[mode] for mode in MODES if mode in modes), "play")
+    return [command, *replay_file, *rest]
 
 
 if __name__ == "__main__":
-    parser = ArgumentParser(description="Invador game that control with Program.")
-    parser.add_argument("--strategy", "-S", type=str, help="Player strategy to use.")
-    args = parser.parse_args()
-
-    strategy = 0
-
-    if args.strategy is None:
-        pass
-    elif args.strategy not in map(lambda x: x.name, player_strategys):
-        print(f"Unknown strategy: {args.strategy}")
-        print("Available strategies:")
-        for strategy in player_strategys:
-            print(f"- {strategy.name}")
-        exit(1)
-    else:
-        for i, st in enumerate(player_strategys):
-            if st.name == args.strategy:
-                strategy = i
-                break
-        strategy = next(i for i, s in enumerate(player_strategys) if s.name == args.strategy)
-
-    try:
-        Screen.wrapper(main, arguments=[strategy])
-    except KeyboardInterrupt:
-        pass
+    sys.exit(main(to_subcommand(sys.argv[1:])))
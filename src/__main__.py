@@ -0,0 +1,272 @@
+"""コマンドラインの入口。
+
+    python -m src list
+    python -m src play --strategy Lookahead
+    python -m src simulate --strategy Predict --games 1000
+    python -m src tournament --games 1000 --sizes 80x24,200x60
+    python -m src replay game.rep --seek 500
+
+サブコマンドで使うモジュールだけをその場でimportする(listは戦略もゲームも読み込まない)。
+run.pyもオプションをここのサブコマンドに読み替えて呼ぶ。
+"""
+import sys
+from argparse import ArgumentParser, Namespace
+
+from src.sizes import parse_size, parse_sizes
+from src.strategies import DEFAULT_STRATEGY, has_strategy, strategy_names
+
+
+def _check_strategy(name: str) -> bool:
+    if has_strategy(name):
+        return True
+    print(f"Unknown strategy: {name}")
+    print("Available strategies:")
+    for available in strategy_names():
+        print(f"- {available}")
+    return False
+
+
+def _stage_class(args: Namespace) -> type:
+    if args.swarm:
+        from src.swarm import SwarmInvaderStage
+
+        return SwarmInvaderStage
+    from src.stage import InvaderStage
+
+    return InvaderStage
+
+
+def command_list(args: Namespace) -> int:
+    for name in strategy_names():
+        print(name)
+    return 0
+
+
+def command_simulate(args: Namespace) -> int:
+    if not _check_strategy(args.strategy):
+        return 1
+
+    from src.headless import run_headless, summarize
+    from src.strategies import create_strategy
+
+    budgeted = None
+    if args.budget is not None:
+        from src.budget import BudgetedStrategy
+
+        budgeted = BudgetedStrategy(args.strategy, args.budget / 1000, args.budget_mode)
+
+    profiler = recorder = telemetry = None
+    if args.profile is not None:
+        from src.profiler import Profiler
+
+        profiler = Profiler()
+    if args.record is not None:
+        from src.replay import ReplayRecorder
+
+        recorder = ReplayRecorder(open(args.record, "wb"))
+    if args.telemetry is not None:
+        from src.telemetry import TelemetrySink
+
+        telemetry = TelemetrySink(args.telemetry)
+
+    try:
+        results = run_headless(
+            budgeted or create_strategy(args.strategy), args.games, args.seed, args.size or (80, 24), _stage_class(args),
+            recorder, profiler, telemetry,
+        )
+    finally:
+        if budgeted is not None:
+            budgeted.close()
+        if recorder is not None:
+            recorder.close()
+        if telemetry is not None:
+            telemetry.close()
+
+    if profiler is not None:
+        with open(args.profile, "w") as profile_file:
+            profile_file.write(profiler.to_json())
+    if telemetry is not None:
+        print(f"Telemetry: {telemetry.written} records written, {telemetry.dropped} dropped")
+    print(f"Strategy: {args.strategy}")
+    if budgeted is not None:
+        print(f"Deadline misses: {budgeted.deadline_misses}/{budgeted.decisions} ({budgeted.miss_rate:.1%})")
+    print(summarize(results))
+    return 0
+
+
+def command_play(args: Namespace) -> int:
+    if not _check_strategy(args.strategy):
+        return 1
+
+    from asciimatics.screen import Screen
+
+    stage_class = _stage_class(args)
+    if args.compare:
+        from src.main import compare_main
+
+        try:
+            Screen.wrapper(
+                compare_main,
+                arguments=[stage_class, args.size, args.rate, args.fps, 0 if args.seed is None else args.seed],
+            )
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    from src.main import main
+
+    recorder = telemetry = None
+    if args.record is not None:
+        from src.replay import ReplayRecorder
+
+        recorder = ReplayRecorder(open(args.record, "wb"))
+    if args.telemetry is not None:
+        from src.telemetry import TelemetrySink
+
+        telemetry = TelemetrySink(args.telemetry)
+
+    def play(screen) -> None:
+        main(
+            screen,
+            args.strategy,
+            stage_class=stage_class,
+            recorder=recorder,
+            board_size=args.size,
+            sim_rate=args.rate,
+            frame_rate=args.fps,
+            telemetry=telemetry,
+            turbo=args.turbo,
+            rewind_steps=args.rewind,
+            budget=None if args.budget is None else args.budget / 1000,
+            budget_mode=args.budget_mode,
+            seed=args.seed,
+        )
+
+    try:
+        Screen.wrapper(play)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if telemetry is not None:
+            telemetry.close()
+    return 0
+
+
+def command_tournament(args: Namespace) -> int:
+    if args.strategy is not None and not _check_strategy(args.strategy):
+        return 1
+
+    from src.tournament import format_summaries, run_tournament, summarize_tournament, write_report
+
+    strategies = strategy_names() if args.strategy is None else [args.strategy]
+    records = run_tournament(
+        strategies, range(args.seed, args.seed + args.games), args.sizes or [args.size or (80, 24)], _stage_class(args),
+        args.workers,
+    )
+    if args.report is None:
+        print(format_summaries(summarize_tournament(records)))
+    else:
+        with open(args.report, "w", newline="") as report:
+            report_format = "csv" if args.report.endswith(".csv") else "jsonl"
+            print(format_summaries(summarize_tournament(write_report(records, report, report_format))))
+    return 0
+
+
+def command_replay(args: Namespace) -> int:
+    from src.replay import ReplayPlayer, ReplayReader, export_replay
+
+    with open(args.file, "rb") as replay_file:
+        replay = ReplayPlayer(ReplayReader(replay_file), args.game)
+        if args.export is not None:
+            with open(args.export, "w") as export_file:
+                export_replay(replay, export_file, args.seek)
+            return 0
+
+        from asciimatics.screen import Screen
+
+        from src.main import replay_main
+
+        try:
+            Screen.wrapper(replay_main, arguments=[replay, args.seek, args.rate])
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def build_parser() -> ArgumentParser:
+    parser = ArgumentParser(prog="python -m src", description="Invador game that control with Program.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # ゲームを回すサブコマンドで共通の引数
+    board = ArgumentParser(add_help=False)
+    board.add_argument("--swarm", action="store_true", help="Use NumPy swarm backend for enemies (requires numpy).")
+
+    # play/simulateで共通の引数
+    common = ArgumentParser(add_help=False)
+    common.add_argument("--strategy", "-S", type=str, default=DEFAULT_STRATEGY, help="Player strategy to use.")
+    common.add_argument("--record", type=str, default=None, help="Record played games to a replay file.")
+    common.add_argument("--budget", type=float, default=None, metavar="MS",
+                        help="Give each decision at most MS milliseconds, falling back to the previous action.")
+    common.add_argument("--budget-mode", choices=("thread", "process"), default="thread",
+                        help="Run the budgeted strategy in a worker thread or process.")
+    common.add_argument("--telemetry", type=str, default=None,
+                        help="Stream per-step records to JSON Lines or CSV (.csv), gzip if it ends with .gz.")
+
+    commands.add_parser("list", help="List available strategies.").set_defaults(handler=command_list)
+
+    play = commands.add_parser("play", parents=[board, common], help="Watch a strategy play on the terminal.")
+    play.add_argument("--seed", type=int, default=None,
+                      help="Seed of the first game (the next games use the following seeds). Random if omitted.")
+    play.add_argument("--size", type=parse_size, default=None, help="Board size (WxH). Defaults to the terminal size.")
+    play.add_argument("--rate", type=float, default=100, help="Simulation steps per second.")
+    play.add_argument("--fps", type=float, default=60, help="Maximum frames drawn per second.")
+    play.add_argument("--turbo", type=int, nargs="?", const=0, default=None, metavar="STEPS",
+                      help="Start in turbo mode: STEPS steps per frame, or as many as fit in a 30 fps frame.")
+    play.add_argument("--rewind", type=int, default=5000, metavar="STEPS",
+                      help="Keep the last STEPS steps to step back through while paused (0 disables).")
+    play.add_argument("--compare", action="store_true",
+                      help="Run every strategy side by side on the same seeds (starting from --seed or 0).")
+    play.set_defaults(handler=command_play)
+
+    simulate = commands.add_parser(
+        "simulate", parents=[board, common], help="Run games without screen as fast as possible."
+    )
+    simulate.add_argument("--seed", type=int, default=0, help="Seed of the first game.")
+    simulate.add_argument("--size", type=parse_size, default=None, help="Board size (WxH). Defaults to 80x24.")
+    simulate.add_argument("--games", type=int, default=100, help="Number of games.")
+    simulate.add_argument("--profile", type=str, default=None, help="Dump per-phase timings as JSON.")
+    simulate.set_defaults(handler=command_simulate)
+
+    tournament = commands.add_parser(
+        "tournament", parents=[board], help="Run every strategy over seeds and sizes on all cores."
+    )
+    tournament.add_argument("--strategy", "-S", type=str, default=None,
+                            help="Only run this strategy. Every strategy if omitted.")
+    tournament.add_argument("--seed", type=int, default=0, help="Seed of the first game.")
+    tournament.add_argument("--games", type=int, default=100, help="Number of seeds per strategy and size.")
+    tournament.add_argument("--size", type=parse_size, default=None, help="Board size (WxH). Defaults to 80x24.")
+    tournament.add_argument("--sizes", type=parse_sizes, default=None, help="Comma separated board sizes (WxH).")
+    tournament.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    tournament.add_argument("--report", type=str, default=None, help="Write results to CSV (.csv) or JSON Lines.")
+    tournament.set_defaults(handler=command_tournament)
+
+    replay = commands.add_parser("replay", help="Play back or export a replay file.")
+    replay.add_argument("file", type=str, help="Replay file written by --record.")
+    replay.add_argument("--game", "--replay-game", type=int, default=0, help="Index of the game in the replay file.")
+    replay.add_argument("--seek", type=int, default=0, help="Step to start the replay from.")
+    replay.add_argument("--export", type=str, default=None, help="Export the replay as JSON Lines instead of showing it.")
+    replay.add_argument("--rate", type=float, default=100, help="Replay steps per second.")
+    replay.set_defaults(handler=command_replay)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+from collections import deque
+from typing import Iterable, Iterator
+
+
+class BulletStore:
+    """弾を列(x座標)ごとにまとめて持つ入れ物。
+
+    弾は全部同じ速さで上にしか動かないので、列ごとに「y - 経過ステップ数」をキーにして、
+    下にいる弾ほど後ろになるように並べておく。経過ステップ数を1増やすだけで全部の弾が1マス進み、
+    画面の外に出た弾は各列の先頭から取り除くだけで済む。
+    外からは(x, y)のタプルの列として見える。
+    """
+
+    def __init__(self, bullets: Iterable[tuple[int, int]] = ()) -> None:
+        self._columns: dict[int, deque[int]] = {}
+        self._tick = 0
+        self._count = 0
+        for bullet in bullets:
+            self.add(bullet)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        tick = self._tick
+        for x, column in self._columns.items():
+            for key in column:
+                yield x, key + tick
+
+    def add(self, position: tuple[int, int]) -> None:
+        x, y = position
+        key = y - self._tick
+        column = self._columns.get(x)
+        if column is None:
+            self._columns[x] = deque((key,))
+        elif key <= column[-1]:
+            # 自機から撃った弾はその列で一番下にいるので、普通は後ろに足すだけ
+            column.append(key)
+        else:
+            for index, other in enumerate(column):
+                if other < key:
+                    column.insert(index, key)
+                    break
+        self._count += 1
+
+    def remove(self, position: tuple[int, int]) -> None:
+        x, y = position
+        column = self._columns[x]
+        column.remove(y - self._tick)
+        if not column:
+            del self._columns[x]
+        self._count -= 1
+
+    def clear(self) -> None:
+        self._columns.clear()
+        self._tick = 0
+        self._count = 0
+
+    def advance(self, top: int, lowest: int) -> list[tuple[int, int]]:
+        """全部の弾を1マス上げて、yがtopを超えた弾を消す。
+        敵に当たる可能性のある(yがlowest以上の)弾の位置を、上にいるものから順に返す。
+        """
+        self._tick += 1
+        tick = self._tick
+        out = top - tick
+        below = lowest - tick
+
+        candidates: list[tuple[int, int]] = []
+        empty: list[int] = []
+        for x, column in self._columns.items():
+            while column and column[0] > out:
+                column.popleft()
+                self._count -= 1
+            if not column:
+                empty.append(x)
+                continue
+
+            # 一番下の敵より下にいる弾は当たらないので見ない
+            for key in column:
+                if key < below:
+                    break
+                candidates.append((x, key + tick))
+
+        for x in empty:
+            del self._columns[x]
+
+        # 撃った順(=上にいる順)に当たり判定をする
+        candidates.sort(key=lambda position: -position[1])
+        return candidates
@@ -0,0 +1,168 @@
+import asyncio
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from time import perf_counter
+from typing import Any, AsyncIterator, TypedDict
+
+from src.driver import FixedTimestep
+from src.game import GameModel
+from src.strategies import get_strategy
+from src.type.abstracts import BaseGameStage
+from src.viewport import Viewport
+
+
+class PaneFrame(TypedDict):
+    index: int
+    round: int
+    step: int
+    score: int
+    enemies: int
+    done: bool
+    cleared: bool
+    # デッドラインのペイン内の行(映っていなければNone)
+    deadline_row: int | None
+    # ペイン内の座標に直した(文字, x, y)
+    cells: list[tuple[str, int, int]]
+
+
+def pane_frame(index: int, round_number: int, game: GameModel, viewport: Viewport) -> PaneFrame:
+    """ペインに映る範囲だけを、描くだけの形にして送れるようにする"""
+    stage_state = game.gamestate["stage"]
+    viewport.follow(game.gamestate["player"]["position"])
+    to_screen = viewport.to_screen
+
+    cells: list[tuple[str, int, int]] = []
+    for enemy in game.stage.enemies_in_area(viewport.x_range, viewport.y_range):
+        if (position := to_screen(enemy.position)) is not None:
+            cells.append((enemy.char, *position))
+    for bullet in stage_state["bullets"]:
+        if (position := to_screen(bullet)) is not None:
+            cells.append(("|", *position))
+    if (position := to_screen(game.gamestate["player"]["position"])) is not None:
+        cells.append(("A", *position))
+
+    deadline = to_screen((viewport.left, stage_state["deadline"]))
+    return {
+        "index": index,
+        "round": round_number,
+        "step": game.step_count,
+        "score": stage_state["total_score"],
+        "enemies": stage_state["enemy_count"],
+        "done": game.is_game_over,
+        "cleared": not stage_state["enemy_count"],
+        "deadline_row": None if deadline is None else deadline[1],
+        "cells": cells,
+    }
+
+
+def run_worker(
+    connection: Connection,
+    index: int,
+    name: str,
+    stage_class: type[BaseGameStage],
+    board_size: tuple[int, int],
+    pane_size: tuple[int, int],
+    sim_rate: float,
+    frame_rate: float,
+) -> None:
+    """ワーカープロセスの中身。nameの戦略で1ゲームずつ進め、index番目のペインのフレームを送り返す。
+
+    命令は("start", (ラウンド, シード)), ("rate", ステップ/秒), ("stop", None)。
+    命令と次のステップ/フレームの時間をconnection.poll()で待つので、何も無いときは眠っている。
+    """
+    strategy = get_strategy(name)
+    game = GameModel(stage_class(board_size))
+    viewport = Viewport(board_size, pane_size)
+    timestep = FixedTimestep(sim_rate)
+    frame_interval = 1 / frame_rate
+    round_number = -1
+    running = False
+    dirty = False
+    last_frame = 0.0
+
+    while True:
+        timeout = timestep.until_next() if running else None
+        if dirty:
+            until_frame = max(0.0, last_frame + frame_interval - perf_counter())
+            timeout = until_frame if timeout is None else min(timeout, until_frame)
+
+        if connection.poll(timeout):
+            command, value = connection.recv()
+            match command:
+                case "start":
+                    round_number, seed = value
+                    game.initialize_game(seed)
+                    strategy.reset()
+                    timestep = FixedTimestep(timestep.rate)
+                    running = dirty = True
+                case "rate":
+                    timestep.rate = value
+                case "stop":
+                    return
+
+        if running:
+            for _ in range(timestep.due()):
+                game.emuration_step(strategy.decide_action)
+                dirty = True
+                if game.is_game_over:
+                    running = False
+                    break
+
+        now = perf_counter()
+        if dirty and now - last_frame >= frame_interval:
+            connection.send(pane_frame(index, round_number, game, viewport))
+            last_frame = now
+            dirty = False
+
+
+class CompareWorker:
+    """1つの戦略を別プロセスで動かし、パイプで命令とフレームをやり取りする"""
+
+    def __init__(
+        self,
+        index: int,
+        name: str,
+        stage_class: type[BaseGameStage],
+        board_size: tuple[int, int],
+        pane_size: tuple[int, int],
+        sim_rate: float,
+        frame_rate: float,
+    ) -> None:
+        self.connection, child = Pipe()
+        self.process = Process(
+            target=run_worker,
+            args=(child, index, name, stage_class, board_size, pane_size, sim_rate, frame_rate),
+            name=f"compare-{name}",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    def send(self, command: str, value: Any = None) -> None:
+        self.connection.send((command, value))
+
+    async def frames(self) -> AsyncIterator[PaneFrame]:
+        """届いたフレームを順に返す。ワーカーが終わったら止まる"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    frame = await loop.run_in_executor(None, self.connection.recv)
+                except (EOFError, OSError):
+                    return
+                yield frame
+        finally:
+            self.connection.close()
+
+    def close(self) -> None:
+        """ワーカーを止める。受信中のframes()はパイプが閉じたところで終わる"""
+        if not self.process.is_alive():
+            return
+        try:
+            self.send("stop")
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
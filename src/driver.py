@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from time import perf_counter
+from typing import AsyncIterator
+
+from asciimatics.event import KeyboardEvent
+from asciimatics.screen import Screen
+
+
+class FixedTimestep:
+    """決まった間隔でシミュレーションを進めるためのアキュムレータ。
+
+    経過時間を貯めておき、1ステップ分(1/rate秒)貯まるごとに1ステップ進める。
+    描画の頻度やsleepの精度に関係なく、平均するとrateステップ/秒になる。
+    """
+
+    def __init__(self, rate: float, max_steps: int = 5) -> None:
+        self.rate = rate
+        # 1回に進めるステップ数の上限(処理が追いつかないときに遅れを取り返そうとし続けないように)
+        self.max_steps = max_steps
+        self._last = perf_counter()
+        self._accumulated = 0.0
+
+    @property
+    def interval(self) -> float:
+        return 1 / self.rate
+
+    def due(self) -> int:
+        """今進めるべきステップ数"""
+        now = perf_counter()
+        self._accumulated += now - self._last
+        self._last = now
+
+        steps = int(self._accumulated / self.interval)
+        if steps > self.max_steps:
+            # 遅れは捨てて、ここから数え直す
+            self._accumulated = 0.0
+            return self.max_steps
+        self._accumulated -= steps * self.interval
+        return steps
+
+    def until_next(self) -> float:
+        """次のステップまでの秒数"""
+        return max(0.0, self.interval - self._accumulated - (perf_counter() - self._last))
+
+
+async def keyboard_events(screen: Screen, poll_interval: float = 0.05) -> AsyncIterator[KeyboardEvent]:
+    """キー入力を待つ。入力が無い間はイベントループを止めない。
+
+    POSIXでは標準入力が読めるようになるまでloop.add_readerで待つ。
+    使えない環境(Windowsなど)では、poll_intervalごとにだけ見に行く。
+    """
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    try:
+        fd = sys.stdin.fileno()
+        loop.add_reader(fd, ready.set)
+    except (NotImplementedError, OSError, ValueError):
+        fd = None
+
+    try:
+        while True:
+            if fd is None:
+                await asyncio.sleep(poll_interval)
+            else:
+                await ready.wait()
+                ready.clear()
+
+            # 届いている分はまとめて取り出す(エスケープシーケンスなどは数バイトで1イベントになる)
+            while (event := screen.get_event()) is not None:
+                if isinstance(event, KeyboardEvent):
+                    yield event
+    finally:
+        if fd is not None:
+            loop.remove_reader(fd)
@@ -1,21 +1,32 @@
 from random import choice
+from typing import Literal
 
 from src.type.abstracts import BaseEnemy
 
 
 class InvaderEnemy(BaseEnemy):
-    def __init__(self, x_position: int, y_position: int) -> None:
-        super().__init__()
-        self.move_count = 3
-        self.hitpoint = 10
+    __slots__ = ()
+
+    move_count = 3
+    move_distance = 1
+    base_score = 100
+
+    def __init__(
+        self,
+        x_position: int,
+        y_position: int,
+        move_direction: Literal["left", "right", "down"] | None = None,
+        moved_count: int = 0,
+        hitpoint: int = 10,
+    ) -> None:
+        super().__init__(moved_count)
+        self.hitpoint = hitpoint
         self.position = (x_position, y_position)
-        self.move_direction = choice(("left", "right"))
-        self.move_distance = 1
-        self.base_score = 100
+        self.move_direction = choice(("left", "right")) if move_direction is None else move_direction
 
     @property
     def char(self) -> str:
-        if self._moved_count % 2:
+        if self.moved_count % 2:
             return "M"
         else:
             return "W"
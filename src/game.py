@@ -1,19 +1,36 @@
+from random import Random
+from time import perf_counter
 from typing import Callable
 
+from src.profiler import Profiler
 from src.type.constants import PLAYER_ACTIONS, GameState
-from src.type.abstracts import BaseEnemy, BaseGameStage
+from src.type.abstracts import BaseEnemy, BaseGameStage, StageSnapshot
+
+# (自機の位置, 弾のクールダウン, ステップ数, ステージのスナップショット)
+GameSnapshot = tuple[tuple[int, int], int, int, StageSnapshot]
+
+# シードを指定しないゲームのシードを引く乱数(プロセス全体のrandomの並びを変えないように分ける)
+_seeds = Random()
 
 
 class GameModel:
-    def __init__(self, stage: BaseGameStage) -> None:
+    def __init__(self, stage: BaseGameStage, seed: int | None = None) -> None:
         self.stage = stage
-        self.initialize_game()
+        # 1ステップごとに(ゲーム, 行動, 撃破した敵)で呼ばれる。記録などに使う
+        self.step_hooks: list[Callable[["GameModel", PLAYER_ACTIONS, list[tuple[BaseEnemy, int]]], None]] = []
+        self.profiler: Profiler | None = None
+        # 盤面はここで1回だけ作る。シードが決まっているなら渡しておけば作り直さずに済む
+        self.initialize_game(seed)
 
     @property
     def is_game_over(self) -> bool:
         return self.stage.is_game_over
 
-    def initialize_game(self) -> None:
+    def initialize_game(self, seed: int | None = None) -> None:
+        # 同じシードなら同じ盤面になる(リプレイはこのシードから再現する)
+        self.seed = _seeds.randrange(1 << 32) if seed is None else seed
+        self.stage.random.seed(self.seed)
+        self.step_count = 0
         self.stage.stage_reset()
         self.gamestate: GameState = {
             "player": {
@@ -23,14 +40,44 @@ class GameModel:
             "stage": self.stage.stage_state,
         }
 
+    def snapshot(self) -> GameSnapshot:
+        """探索などで何度も戻すための軽い状態コピー(戦略オブジェクトは含まない)"""
+        return (
+            self.gamestate["player"]["position"],
+            self.gamestate["player"]["bullet_cooldown"],
+            self.step_count,
+            self.stage.snapshot(),
+        )
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        position, bullet_cooldown, step_count, stage_snapshot = snapshot
+        self.gamestate["player"]["position"] = position
+        self.gamestate["player"]["bullet_cooldown"] = bullet_cooldown
+        self.step_count = step_count
+        self.stage.restore(stage_snapshot)
+
     def change_stage(self, stage: BaseGameStage) -> None:
         self.stage = stage
+        self.stage.profiler = self.profiler
         self.initialize_game()
 
+    def set_profiler(self, profiler: Profiler | None) -> None:
+        """フェーズごとの計測を有効にする(Noneで無効)"""
+        self.profiler = profiler
+        self.stage.profiler = profiler
+
     def emuration_step(self, player_strategy: Callable[[GameState], PLAYER_ACTIONS]) -> list[tuple[BaseEnemy, int]]:
         # プレイヤーの行動決定と実行
-        player_action = player_strategy(self.gamestate)
+        if self.profiler is None:
+            player_action = player_strategy(self.gamestate)
+        else:
+            started = perf_counter()
+            player_action = player_strategy(self.gamestate)
+            self.profiler.record("decide_action", perf_counter() - started)
 
+        return self.step(player_action)
+
+    def step(self, player_action: PLAYER_ACTIONS) -> list[tuple[BaseEnemy, int]]:
         match player_action:
             case "left":
                 if self.gamestate["player"]["position"][0] > 0:
@@ -49,6 +96,12 @@ class GameModel:
 
         # ステージのエミュレーションステップ実行
         destoroyed_enemys = self.stage.emuration_step()
+        self.step_count += 1
+        if self.profiler is not None:
+            self.profiler.step()
+
+        for hook in self.step_hooks:
+            hook(self, player_action, destoroyed_enemys)
 
         return destoroyed_enemys
 
@@ -0,0 +1,84 @@
+from statistics import mean, median
+from time import perf_counter
+from typing import TYPE_CHECKING, TypedDict
+
+from src.game import GameModel
+from src.stage import InvaderStage
+from src.type.abstracts import BaseGameStage, BasePlayerStrategy
+
+if TYPE_CHECKING:
+    from src.profiler import Profiler
+    from src.replay import ReplayRecorder
+    from src.telemetry import TelemetrySink
+
+
+class GameResult(TypedDict):
+    seed: int
+    score: int
+    steps: int
+    cleared: bool
+    elapsed: float
+
+
+def play_game(game: GameModel, strategy: BasePlayerStrategy, seed: int) -> GameResult:
+    """シード固定で1ゲームを最後まで(描画無し・ウェイト無しで)回す"""
+    game.initialize_game(seed)
+    strategy.reset()
+
+    steps = 0
+    started = perf_counter()
+    while not game.is_game_over:
+        game.emuration_step(strategy.decide_action)
+        steps += 1
+    elapsed = perf_counter() - started
+
+    return {
+        "seed": seed,
+        "score": game.gamestate["stage"]["total_score"],
+        "steps": steps,
+        "cleared": not game.gamestate["stage"]["enemies"],
+        "elapsed": elapsed,
+    }
+
+
+def run_headless(
+    strategy: BasePlayerStrategy,
+    games: int,
+    seed: int,
+    screen_size: tuple[int, int],
+    stage_class: type[BaseGameStage] = InvaderStage,
+    recorder: "ReplayRecorder | None" = None,
+    profiler: "Profiler | None" = None,
+    telemetry: "TelemetrySink | None" = None,
+) -> list[GameResult]:
+    game = GameModel(stage_class(screen_size))
+    game.set_profiler(profiler)
+    if recorder is not None:
+        recorder.attach(game)
+    if telemetry is not None:
+        telemetry.attach(game)
+
+    return [play_game(game, strategy, seed + i) for i in range(games)]
+
+
+def summarize(results: list[GameResult]) -> str:
+    if not results:
+        return "No games played."
+
+    scores = sorted(result["score"] for result in results)
+    steps = sum(result["steps"] for result in results)
+    elapsed = sum(result["elapsed"] for result in results)
+    cleared = sum(result["cleared"] for result in results)
+
+    def percentile(p: float) -> int:
+        return scores[min(len(scores) - 1, int(len(scores) * p))]
+
+    lines = [
+        f"Games: {len(results)}",
+        f"Steps: {steps} ({steps / elapsed if elapsed > 0 else 0:.0f} steps/sec)",
+        f"Score: min={scores[0]} p25={percentile(0.25)} median={median(scores)} "
+        f"p75={percentile(0.75)} max={scores[-1]} mean={mean(scores):.1f}",
+        f"Clear: {cleared / len(results):.1%}",
+        f"Game Over: {(len(results) - cleared) / len(results):.1%}",
+    ]
+    return "\n".join(lines)
@@ -1,105 +1,624 @@
-from time import sleep
-from typing import cast
+import asyncio
+from time import perf_counter
+from typing import Literal
 
 from asciimatics.screen import Screen
-from asciimatics.constants import COLOUR_WHITE, COLOUR_RED
-from asciimatics.event import KeyboardEvent
+from asciimatics.constants import COLOUR_CYAN, COLOUR_GREEN, COLOUR_RED, COLOUR_WHITE, COLOUR_YELLOW
 
-from src.player import player_strategys
-from src.type.constants import KEY_Q, KEY_LOWQ
+from src.type.constants import (
+    KEY_Q, KEY_LOWQ, KEY_P, KEY_LOWP, KEY_N, KEY_LOWN, KEY_T, KEY_LOWT, KEY_SPACE,
+    KEY_COMMA, KEY_PERIOD, KEY_LESS, KEY_GREATER,
+)
+from src.compare import CompareWorker, PaneFrame
+from src.budget import BudgetedStrategy
+from src.driver import FixedTimestep, keyboard_events
 from src.game import GameModel
+from src.profiler import Profiler
+from src.renderer import DirtyRenderer
+from src.rewind import RewindBuffer
+from src.replay import ReplayPlayer, ReplayRecorder
 from src.stage import InvaderStage
+from src.strategies import get_strategy, strategy_names
+from src.telemetry import TelemetrySink
+from src.type.abstracts import BaseEnemy, BaseGameStage, BasePlayerStrategy
+from src.viewport import Viewport
 
+# (消えるステップ, メッセージ, 盤面上の位置)
+Messages = list[tuple[int, str, tuple[int, int]]]
 
-def main(screen: Screen, init_strategy: int) -> None:
+# 敵破壊メッセージを出しておくステップ数
+MESSAGE_STEPS = 20
+
+# 上下キーで切り替えるシミュレーション速度(ステップ/秒)
+SIM_RATES = (2, 5, 10, 20, 30, 50, 100, 200, 500, 1000)
+
+# ターボ中の描画の上限(フレーム/秒)
+TURBO_FRAME_RATE = 30
+
+# ミニマップで敵の多さを表す文字
+DENSITY_CHARS = " .:+*#"
+
+
+def draw_background(
+    renderer: DirtyRenderer, screen: Screen, game: GameModel, help_text: str, viewport: Viewport
+) -> None:
+    # デッドラインとヘルプは動かないので背景として一度だけ描く(縦にスクロールしたら描き直す)
+    renderer.clear()
+    deadline = viewport.to_screen((viewport.left, game.gamestate["stage"]["deadline"]))
+    if deadline is not None:
+        renderer.background("-" * screen.width, 0, deadline[1], colour=COLOUR_RED)
+    renderer.text("help", help_text, screen.width - len(help_text) - 4, screen.height - 2)
+    if viewport.scrolling:
+        scroll_help = "PgUp/PgDn/Home: scroll"
+        renderer.text("scroll_help", scroll_help, screen.width - len(scroll_help) - 4, screen.height - 1)
+
+
+def draw_game(renderer: DirtyRenderer, screen: Screen, game: GameModel, messages: Messages, viewport: Viewport) -> None:
+    # ゲームの表示(画面に映る範囲だけを積み、前フレームから変わったセルだけが書かれる)
+    viewport.follow(game.gamestate["player"]["position"])
+    to_screen = viewport.to_screen
+
+    player = to_screen(game.gamestate["player"]["position"])
+    if player is not None:
+        renderer.put("A", *player)
+    for enemy in game.stage.enemies_in_area(viewport.x_range, viewport.y_range):
+        position = to_screen(enemy.position)
+        if position is not None:
+            renderer.put(enemy.char, *position)
+    for bullet in game.gamestate["stage"]["bullets"]:
+        position = to_screen(bullet)
+        if position is not None:
+            renderer.put("|", *position)
+
+    # 敵破壊メッセージの表示(消える時間を過ぎたものは捨てる)
+    if messages and messages[0][0] <= game.step_count:
+        messages[:] = [entry for entry in messages if entry[0] > game.step_count]
+    for _, message, board_position in messages:
+        position = to_screen(board_position)
+        if position is not None:
+            renderer.put_text(message, *position)
+
+    # ゲーム情報関係の表示(値が変わったときだけ描き直される)
+    renderer.text("score", f"Score: {game.gamestate['stage']['total_score']}", 2, screen.height - 2)
+    renderer.text("max_score", f"Max Score: {game.gamestate['stage']['max_score']}", 2, screen.height - 3)
+    renderer.text("enemies", f"Enemies: {game.gamestate['stage']['enemy_count']}", 20, screen.height - 2)
+
+
+def draw_minimap(
+    renderer: DirtyRenderer, screen: Screen, game: GameModel, viewport: Viewport, density: list[list[int]]
+) -> None:
+    """盤面全体の敵の分布を右上に縮小して描く。画面に映っている範囲は色を変える"""
+    rows, columns = len(density), len(density[0])
+    board_width, board_height = viewport.board_size
+    left = screen.width - columns - 3
+    most = max(max(row) for row in density) or 1
+
+    view_columns = range(
+        viewport.left * columns // board_width,
+        (viewport.x_range[-1]) * columns // board_width + 1,
+    )
+    view_rows = range(
+        max(0, (board_height - viewport.y_range[-1]) * rows // board_height),
+        min(rows - 1, (board_height - viewport.y_range[0]) * rows // board_height) + 1,
+    )
+    player_x, player_y = game.gamestate["player"]["position"]
+    player_cell = (
+        min(columns - 1, player_x * columns // board_width),
+        min(rows - 1, max(0, (board_height - player_y) * rows // board_height)),
+    )
+
+    renderer.put_text("+" + "-" * columns + "+", left, 0)
+    for row, counts in enumerate(density):
+        renderer.put("|", left, row + 1)
+        for column, count in enumerate(counts):
+            char = DENSITY_CHARS[-(-count * (len(DENSITY_CHARS) - 1) // most)]
+            if (column, row) == player_cell:
+                renderer.put("A", left + column + 1, row + 1, colour=COLOUR_GREEN)
+            elif column in view_columns and row in view_rows:
+                renderer.put(char if count else ".", left + column + 1, row + 1, colour=COLOUR_CYAN)
+            else:
+                renderer.put(char, left + column + 1, row + 1)
+        renderer.put("|", left + columns + 1, row + 1)
+    renderer.put_text("+" + "-" * columns + "+", left, rows + 1)
+
+
+def scroll_viewport(viewport: Viewport, key_code: int, page: int) -> bool:
+    """PgUp/PgDnで縦にスクロール、Homeで一番下に戻す。スクロールしたかどうかを返す"""
+    if key_code == Screen.KEY_PAGE_UP:
+        return viewport.scroll(page)
+    elif key_code == Screen.KEY_PAGE_DOWN:
+        return viewport.scroll(-page)
+    elif key_code == Screen.KEY_HOME:
+        return viewport.scroll(-viewport.bottom)
+    return False
+
+
+def update_messages(messages: Messages, destroyed_enemies: list[tuple[BaseEnemy, int]], step: int) -> None:
+    # 敵破壊メッセージは消えるステップを覚えておき、描くときに捨てる
+    # (描かないステップがいくつあっても、ステップごとに数え直さなくて済む)
+    for enemy, score in destroyed_enemies:
+        messages.append((step + MESSAGE_STEPS, f"+{score}", enemy.position))
+
+
+def change_rate(rate: float, faster: bool) -> float:
+    """SIM_RATESの中で1段階速く/遅くしたシミュレーション速度"""
+    if faster:
+        return next((r for r in SIM_RATES if r > rate), rate)
+    return next((r for r in reversed(SIM_RATES) if r < rate), rate)
+
+
+def main(
+    screen: Screen,
+    init_strategy: str,
+    stage_class: type[BaseGameStage] = InvaderStage,
+    recorder: ReplayRecorder | None = None,
+    board_size: tuple[int, int] | None = None,
+    sim_rate: float = 100,
+    frame_rate: float = 60,
+    telemetry: TelemetrySink | None = None,
+    turbo: int | None = None,
+    rewind_steps: int = 5000,
+    budget: float | None = None,
+    budget_mode: Literal["thread", "process"] = "thread",
+    seed: int | None = None,
+) -> None:
+    """turboを渡すとターボで始める。1フレームにturboステップ進め、0なら描画の間隔いっぱいまで進める。
+    Spaceで止め、止めている間は直近rewind_stepsステップを行き来できる(0なら記録せず、止めても前にだけ進める)。
+    budget(秒)を渡すと戦略をBudgetedStrategyで動かし、判断が遅くても描画が止まらないようにする。
+    seedを渡すと最初のゲームをそのシードで始め、次のゲームからは1ずつ増やす(無ければ毎回ランダム)。
+    """
+    def current_strategy() -> BasePlayerStrategy:
+        name = names[strategy]
+        if budget is None:
+            return get_strategy(name)
+        if name not in budgeted:
+            budgeted[name] = BudgetedStrategy(name, budget, budget_mode)
+        return budgeted[name]
+
+    def draw():
+        nonlocal profile_lines, density, speed_since, speed_steps, measured_rate
+
+        if game.profiler is not None:
+            started = perf_counter()
+
+        draw_game(renderer, screen, game, destoroy_enemy_messages, viewport)
+        if turbo is None:
+            renderer.text("speed", f"Speed: {timestep.rate:g} steps/s", 20, screen.height - 3)
+        else:
+            # ターボ中は実際に進んだ速さを1秒ごとに出す
+            now = perf_counter()
+            if now - speed_since >= 1:
+                measured_rate = (steps_done - speed_steps) / (now - speed_since)
+                speed_since, speed_steps = now, steps_done
+            renderer.text("speed", f"Speed: turbo {measured_rate:.0f} steps/s", 20, screen.height - 3)
+        renderer.text("strategy", f"Strategy: {names[strategy]}", 40, screen.height - 2)
+        if (budgeted_strategy := budgeted.get(names[strategy])) is not None:
+            renderer.text(
+                "misses",
+                f"Misses: {budgeted_strategy.deadline_misses} ({budgeted_strategy.miss_rate:.0%})",
+                52, screen.height - 3,
+            )
+        if paused and rewind is None:
+            renderer.text(
+                "rewind", f"Paused at {game.step_count}  .: 1 step  >: 100 steps", 2, screen.height - 1,
+                colour=COLOUR_CYAN,
+            )
+        elif paused:
+            renderer.text(
+                "rewind",
+                f"Paused at {game.step_count} ({rewind.oldest}-{rewind.newest})  ,/.: 1 step  </>: 100 steps",
+                2, screen.height - 1, colour=COLOUR_CYAN,
+            )
+        else:
+            renderer.text("rewind", "Space: pause", 2, screen.height - 1)
+
+        # 計測結果のオーバーレイ(集計は重いので数フレームに1回)
+        if game.profiler is not None:
+            if game.profiler.counters.get("steps", 0) % 20 == 0 or not profile_lines:
+                profile_lines = game.profiler.format_lines()
+            for i, line in enumerate(profile_lines):
+                renderer.put_text(line, 1, i, colour=COLOUR_YELLOW)
+
+        # 盤面が画面より大きいときはミニマップを出す(数え直しは数フレームに1回)
+        if viewport.scrolling:
+            if game.step_count % 10 == 0 or density is None:
+                density = game.stage.enemy_density(min(40, screen.width // 3), min(8, screen.height // 4))
+            draw_minimap(renderer, screen, game, viewport, density)
+
+        renderer.flush()
+
+        if game.profiler is not None:
+            game.profiler.record("draw", perf_counter() - started)
+
+    def advance():
+        nonlocal steps_done, seed
+
+        if game.is_game_over:
+            if seed is not None:
+                seed += 1
+            game.initialize_game(seed)
+            destoroy_enemy_messages.clear()
+
+        destroyed_enemies = game.emuration_step(current_strategy().decide_action)
+        update_messages(destoroy_enemy_messages, destroyed_enemies, game.step_count)
+        steps_done += 1
+
+    def render_rate() -> float:
+        return frame_rate if turbo is None else min(frame_rate, TURBO_FRAME_RATE)
+
+    def seek(step: int):
+        # 巻き戻しバッファから状態を作り直す(止めたまま)
+        nonlocal paused, seeked
+        paused = True
+        if rewind is None:
+            return
+        seeked = True
+        rewind.seek(game, step)
+        destoroy_enemy_messages.clear()
+
+    def step_forward(steps: int):
+        # 記録の先頭までは記録した行動で進め、残りは戦略で1ステップずつ進める
+        nonlocal paused, seeked
+        paused = True
+        if rewind is not None and game.step_count < rewind.newest:
+            recorded = min(steps, rewind.newest - game.step_count)
+            seek(game.step_count + recorded)
+            steps -= recorded
+        if steps and seeked:
+            current_strategy().reset()
+            seeked = False
+        for _ in range(steps):
+            advance()
+
+    async def simulate():
+        nonlocal seeked
+
+        while True:
+            if paused:
+                await resumed.wait()
+                resumed.clear()
+                if seeked:
+                    # 戦略の内部状態は巻き戻した盤面と合わないので作り直す
+                    current_strategy().reset()
+                    seeked = False
+                timestep.due()  # 止まっていた間の時間は数えない
+                continue
+
+            if turbo is None:
+                # 決まった間隔でゲームを進め、次のステップの時間まで眠る
+                for _ in range(timestep.due()):
+                    advance()
+                    changed.set()
+                await asyncio.sleep(timestep.until_next())
+                continue
+
+            # ターボ: 1フレーム分の時間でturboステップ(0なら進められるだけ)進めてから、描画と入力に譲る
+            # 間のステップは描かない
+            frame_end = perf_counter() + 1 / render_rate()
+            if turbo:
+                for _ in range(turbo):
+                    advance()
+            else:
+                while perf_counter() < frame_end and not paused:
+                    advance()
+            changed.set()
+            await asyncio.sleep(max(0.0, frame_end - perf_counter()))
+            # ターボをやめたときに、その間の時間をまとめて進めないように
+            timestep.due()
+
+    async def render():
+        # 変化があったときだけ、最大でframe_rate回/秒(ターボ中はTURBO_FRAME_RATE回/秒)描く
+        while True:
+            await changed.wait()
+            changed.clear()
+            draw()
+            await asyncio.sleep(1 / render_rate())
+
+    async def handle_input():
+        nonlocal strategy, profile_lines, turbo, speed_since, speed_steps, paused
+
+        async for event in keyboard_events(screen):
+            if event.key_code in (KEY_Q, KEY_LOWQ):
+                return
+            elif event.key_code == KEY_SPACE:
+                paused = not paused
+                resumed.set()
+            elif event.key_code == KEY_COMMA:
+                seek(game.step_count - 1)
+            elif event.key_code == KEY_LESS:
+                seek(game.step_count - 100)
+            elif event.key_code == KEY_PERIOD:
+                step_forward(1)
+            elif event.key_code == KEY_GREATER:
+                step_forward(100)
+            elif event.key_code in (KEY_T, KEY_LOWT):
+                turbo = turbo_steps if turbo is None else None
+                speed_since, speed_steps = perf_counter(), steps_done
+            elif event.key_code in (KEY_P, KEY_LOWP):
+                # 計測のオン/オフ(オフのときはプロファイラを外すので負荷はほぼ無い)
+                game.set_profiler(Profiler() if game.profiler is None else None)
+                profile_lines = []
+            elif event.key_code == Screen.KEY_UP:
+                timestep.rate = change_rate(timestep.rate, faster=False)
+            elif event.key_code == Screen.KEY_DOWN:
+                timestep.rate = change_rate(timestep.rate, faster=True)
+            elif event.key_code == Screen.KEY_RIGHT:
+                strategy = (strategy + 1) % len(names)
+                current_strategy().reset()
+            elif event.key_code == Screen.KEY_LEFT:
+                strategy = (strategy - 1) % len(names)
+                current_strategy().reset()
+            elif scroll_viewport(viewport, event.key_code, screen.height // 2):
+                draw_background(renderer, screen, game, help_text, viewport)
+            else:
+                continue
+            changed.set()
+
+    async def run():
+        async with asyncio.TaskGroup() as tasks:
+            simulation = tasks.create_task(simulate())
+            rendering = tasks.create_task(render())
+            await handle_input()
+            simulation.cancel()
+            rendering.cancel()
+
+    # 盤面の大きさを指定しなければ画面と同じ大きさにする
+    stage = stage_class(board_size or (screen.width, screen.height))
+    game = GameModel(stage, seed)
+    if recorder is not None:
+        recorder.attach(game)
+    if telemetry is not None:
+        telemetry.attach(game)
+    # 止めて行き来できるように、直近のステップを記録しておく(メモリはrewind_stepsで決まる)
+    rewind: RewindBuffer | None = None
+    if rewind_steps:
+        rewind = RewindBuffer(rewind_steps, min(250, rewind_steps))
+        rewind.attach(game)
+    paused = seeked = False
+    resumed = asyncio.Event()
+    renderer = DirtyRenderer(screen)
+    viewport = Viewport(stage.stage_state["screen_size"], (screen.width, screen.height))
+    help_text = "T: turbo, P: profile, Q: quit"
+    draw_background(renderer, screen, game, help_text, viewport)
+    destoroy_enemy_messages: Messages = []
+    # Tキーで切り替えるときのターボの設定
+    turbo_steps = turbo or 0
+    steps_done = 0
+    speed_since, speed_steps, measured_rate = perf_counter(), 0, 0.0
+    # 戦略は左右キーで初めて選ばれたときに作る
+    names = strategy_names()
+    strategy = names.index(init_strategy)
+    budgeted: dict[str, BudgetedStrategy] = {}
+    profile_lines: list[str] = []
+    density: list[list[int]] | None = None
+
+    timestep = FixedTimestep(sim_rate)
+    changed = asyncio.Event()
+    changed.set()
+    try:
+        asyncio.run(run())
+    finally:
+        for budgeted_strategy in budgeted.values():
+            budgeted_strategy.close()
+
+    screen.close()
+    print("Game Over! Your max score:", game.gamestate["stage"]["max_score"])
+    for budgeted_strategy in budgeted.values():
+        print(
+            f"{budgeted_strategy.name}: {budgeted_strategy.deadline_misses}/{budgeted_strategy.decisions} "
+            "decisions missed the budget"
+        )
+
+
+def replay_main(screen: Screen, replay: ReplayPlayer, start: int = 0, sim_rate: float = 100) -> None:
+    """リプレイの再生。Spaceで再生/停止、左右で1ステップ、上下で100ステップ移動する"""
     def draw():
-        # 画面クリア
-        screen.clear_buffer(COLOUR_WHITE, 0, 0)
-
-        # デッドラインの表示
-        deadline_y = game.gamestate["stage"]["deadline"]
-        screen.move(*GameModel.screen_reverser(screen.height, (0, deadline_y)))
-        screen.draw(*GameModel.screen_reverser(screen.height, (screen.width, deadline_y)), char="-", colour=COLOUR_RED)
-
-        # ゲームの表示
-        screen.print_at("A", *GameModel.screen_reverser(screen.height, game.gamestate["player"]["position"]))
-        for enemy in game.gamestate["stage"]["enemies"]:
-            screen.print_at(enemy.char, *GameModel.screen_reverser(screen.height, enemy.position))
-        for bullet in game.gamestate["stage"]["bullets"]:
-            screen.print_at("|", *GameModel.screen_reverser(screen.height, bullet))
-
-        # 敵破壊メッセージの表示
-        for _, message, position in destoroy_enemy_messages:
-            screen.print_at(message, position[0], position[1])
-
-        # ゲーム情報関係の表示
-        screen.print_at(f"Score: {sum(game.gamestate['stage']['scores'])}", 2, screen.height - 2)
-        screen.print_at(f"Max Score: {game.gamestate['stage']['max_score']}", 2, screen.height - 3)
-        screen.print_at(f"Enemies: {len(game.gamestate['stage']['enemies'])}", 20, screen.height - 2)
-        screen.print_at(f"Clock Time: {round(clock_time * 0.01, 2)}", 20, screen.height - 3)
-        screen.print_at(f"Strategy: {player_strategys[strategy].name}", 40, screen.height - 2)
-        screen.print_at("Press Q to quit.", screen.width - 20, screen.height - 2)
-
-        screen.refresh()
-
-    stage = InvaderStage((screen.width, screen.height))
-    game = GameModel(stage)
-    destoroy_enemy_messages: list[tuple[int, str, tuple[int, int]]] = []
-    max_sleep_time = 50
-    minimum_sleep_time = 1
-    strategy = init_strategy
-    clock_time = 1
-    clock = 0
-
-    while True:
-        game.initialize_game()
+        draw_game(renderer, screen, replay.game, destoroy_enemy_messages, viewport)
+        renderer.text("step", f"Step: {replay.position}/{replay.length}", 20, screen.height - 3)
+        renderer.text("state", "Playing" if playing else "Paused", 40, screen.height - 2)
+        renderer.flush()
+
+    def seek(step: int):
+        replay.seek(step)
         destoroy_enemy_messages.clear()
-        while not game.is_game_over:
-            clock += 1
-            # 描画の時間までは描画とか処理をスキップ
-            if clock >= clock_time:
-                # 描画及び実行関数
-                clock = 0
-
-                # 敵破壊メッセージのカウントダウン
-                for i in reversed(range(len(destoroy_enemy_messages))):
-                    count, message, position = destoroy_enemy_messages[i]
-                    if count <= 0:
-                        destoroy_enemy_messages.pop(i)
-                    else:
-                        destoroy_enemy_messages[i] = (count - 1, message, position)
-
-                # ストラテジーを選択
-                player = player_strategys[strategy]
-                # 演算
-                destroyed_enemies = game.emuration_step(player.decide_action)
-
-                # スコアの計算
-                for enemy, score in destroyed_enemies:
-                    destoroy_enemy_messages.append((20, f"+{score}", GameModel.screen_reverser(screen.height, enemy.position)))
+        resumed.set()
+        draw()
+
+    async def play():
+        # 再生中だけ決まった間隔で進める。止まっているときは再生されるまで眠る
+        while True:
+            if not playing or replay.position >= replay.length:
+                await resumed.wait()
+                resumed.clear()
+                timestep.due()  # 止まっていた間の時間は数えない
+                continue
+
+            for _ in range(timestep.due()):
+                update_messages(destoroy_enemy_messages, replay.step(), replay.position)
+            draw()
+            await asyncio.sleep(timestep.until_next())
 
+    async def handle_input():
+        nonlocal playing
+
+        async for event in keyboard_events(screen):
+            if event.key_code in (KEY_Q, KEY_LOWQ):
+                return
+            elif event.key_code == KEY_SPACE:
+                playing = not playing
+                resumed.set()
+                draw()
+            elif event.key_code == Screen.KEY_RIGHT:
+                seek(replay.position + 1)
+            elif event.key_code == Screen.KEY_LEFT:
+                seek(replay.position - 1)
+            elif event.key_code == Screen.KEY_UP:
+                seek(replay.position + 100)
+            elif event.key_code == Screen.KEY_DOWN:
+                seek(replay.position - 100)
+            elif scroll_viewport(viewport, event.key_code, screen.height // 2):
+                draw_background(renderer, screen, replay.game, help_text, viewport)
                 draw()
 
-            # キーボード入力処理
-            event = cast(KeyboardEvent | None, screen.get_event())
-            if isinstance(event, KeyboardEvent):
-                if event.key_code in (KEY_Q, KEY_LOWQ):
-                    screen.close()
-                    print("Game Over! Your max score:", game.gamestate["stage"]["max_score"])
-                    return
-                elif event.key_code == Screen.KEY_UP:
-                    clock_time = min(max_sleep_time, clock_time + 1)
-                    draw()
-                elif event.key_code == Screen.KEY_DOWN:
-                    clock_time = max(minimum_sleep_time, clock_time - 1)
-                    draw()
-                elif event.key_code == Screen.KEY_RIGHT:
-                    strategy = (strategy + 1) % len(player_strategys)
-                    player_strategys[strategy].reset()
-                    draw()
-                elif event.key_code == Screen.KEY_LEFT:
-                    strategy = (strategy - 1) % len(player_strategys)
-                    player_strategys[strategy].reset()
-                    draw()
-
-            sleep(1 / 100)  # 1 clock = 10ms
+    async def run():
+        async with asyncio.TaskGroup() as tasks:
+            playback = tasks.create_task(play())
+            await handle_input()
+            playback.cancel()
+
+    renderer = DirtyRenderer(screen)
+    viewport = Viewport(replay.replay["screen_size"], (screen.width, screen.height))
+    help_text = "Space: play/pause, Q: quit"
+    draw_background(renderer, screen, replay.game, help_text, viewport)
+    destoroy_enemy_messages: Messages = []
+    playing = False
+    timestep = FixedTimestep(sim_rate)
+    resumed = asyncio.Event()
+    seek(start)
+
+    asyncio.run(run())
+
+
+def compare_main(
+    screen: Screen,
+    stage_class: type[BaseGameStage] = InvaderStage,
+    board_size: tuple[int, int] | None = None,
+    sim_rate: float = 100,
+    frame_rate: float = 30,
+    seed: int = 0,
+) -> None:
+    """全部の戦略を同じシードで同時に動かし、画面を横に分けて並べる。
+
+    各戦略は別プロセスで自分のペースで進むので、重い戦略がいても他のペインの描画は止まらない。
+    全部のゲームが終わったら一番スコアの高い戦略に勝ちを数え、次のシードで始め直す。
+    """
+    def draw():
+        leader = max((frame["score"] for frame in frames if frame is not None), default=None)
+        for index, frame in enumerate(frames):
+            left = index * (pane_width + 1)
+            if frame is None:
+                continue
+            if frame["deadline_row"] is not None and index not in deadlines:
+                deadlines.add(index)
+                renderer.background("-" * pane_width, left, frame["deadline_row"], colour=COLOUR_RED)
+            for char, x, y in frame["cells"]:
+                renderer.put(char, left + x, y)
+
+            state = " Cleared" if frame["cleared"] else " Game Over" if frame["done"] else ""
+            status = f"{names[index]}: {frame['score']}/{frame['enemies']}{state}"
+            colour = COLOUR_GREEN if leader and frame["score"] == leader else COLOUR_WHITE
+            renderer.text(f"pane{index}", status[:pane_width], left, screen.height - 2, colour=colour)
+
+        tally = ", ".join(f"{name} {count}" for name, count in zip(names, wins))
+        summary = f"Round {round_number + 1} Seed {seed + round_number} Speed {sim_rate:g} | Wins: {tally}"
+        renderer.text("summary", summary[:screen.width - len(help_text) - 1], 0, screen.height - 1)
+        renderer.flush()
+
+    def start_round():
+        nonlocal frames
+        frames = [None] * len(workers)
+        for worker in workers:
+            worker.send("start", (round_number, seed + round_number))
+
+    async def receive(index: int, worker: CompareWorker):
+        async for frame in worker.frames():
+            if frame["round"] != round_number:
+                # 前のラウンドの残り
+                continue
+            frames[index] = frame
+            changed.set()
+            if all(frame is not None and frame["done"] for frame in frames) and tallied < round_number:
+                finish_round()
+
+    def finish_round():
+        nonlocal tallied
+        tallied = round_number
+        best = max(frame["score"] for frame in frames)
+        for index, frame in enumerate(frames):
+            if frame["score"] == best:
+                wins[index] += 1
+        asyncio.get_running_loop().call_later(3, lambda current=round_number: current == round_number and advance.set())
+
+    async def rounds():
+        nonlocal round_number
+        while True:
+            await advance.wait()
+            advance.clear()
+            round_number += 1
+            renderer.clear()
+            draw_separators()
+            deadlines.clear()
+            start_round()
+
+    async def render():
+        while True:
+            await changed.wait()
+            changed.clear()
+            draw()
+            await asyncio.sleep(1 / frame_rate)
+
+    async def handle_input():
+        nonlocal sim_rate
+
+        async for event in keyboard_events(screen):
+            if event.key_code in (KEY_Q, KEY_LOWQ):
+                return
+            elif event.key_code in (KEY_N, KEY_LOWN):
+                advance.set()
+            elif event.key_code in (Screen.KEY_UP, Screen.KEY_DOWN):
+                sim_rate = change_rate(sim_rate, faster=event.key_code == Screen.KEY_DOWN)
+                for worker in workers:
+                    worker.send("rate", sim_rate)
+            else:
+                continue
+            changed.set()
+
+    def draw_separators():
+        for index in range(1, len(names)):
+            for y in range(screen.height - 1):
+                renderer.background("|", index * (pane_width + 1) - 1, y)
+        renderer.text("help", help_text, screen.width - len(help_text), screen.height - 1)
+
+    async def run():
+        try:
+            async with asyncio.TaskGroup() as tasks:
+                receivers = [tasks.create_task(receive(index, worker)) for index, worker in enumerate(workers)]
+                others = [tasks.create_task(rounds()), tasks.create_task(render())]
+                start_round()
+                await handle_input()
+                for task in others:
+                    task.cancel()
+                # ワーカーが終わるとパイプが閉じ、受信側も終わる
+                for worker in workers:
+                    worker.close()
+                await asyncio.gather(*receivers)
+        finally:
+            for worker in workers:
+                worker.close()
+
+    names = strategy_names()
+    # ペインは縦に区切り線を挟んで横に並べ、一番下の行は全体の表示に使う
+    pane_width = (screen.width - (len(names) - 1)) // len(names)
+    pane_size = (pane_width, screen.height - 1)
+    board_size = board_size or pane_size
+    workers = [
+        CompareWorker(index, name, stage_class, board_size, pane_size, sim_rate, frame_rate)
+        for index, name in enumerate(names)
+    ]
+
+    renderer = DirtyRenderer(screen)
+    help_text = "N: next, Q: quit"
+    draw_separators()
+    deadlines: set[int] = set()
+    frames: list[PaneFrame | None] = []
+    wins = [0] * len(names)
+    round_number = 0
+    tallied = -1
+    changed = asyncio.Event()
+    advance = asyncio.Event()
+
+    asyncio.run(run())
+
+    screen.close()
+    for name, count in zip(names, wins):
+        print(f"{name}: {count} wins")
@@ -1,123 +1,288 @@
+from collections import deque
+from copy import copy
+from heapq import heappop, heappush
+from typing import Iterable, Mapping, Sequence
+
+from src.game import GameModel, GameSnapshot
+from src.stage import SandboxStage
+from src.trajectory import descent_frames, predict_intersection
 from src.type.abstracts import BasePlayerStrategy, BaseEnemy
+from src.type.constants import ACTIONS_BY_CODE, GameState, PLAYER_ACTIONS
+
+
+class _PredictedColumns:
+    """PredictStrategyが狙う敵を選ぶための、交差予測したxの列ごとに敵のidを分けた索引。
+
+    予測は最大refresh_framesフレーム前のものまで使い、敵を選ぶたびに古いものから少しずつ予測し直す。
+    kフレーム前に撃った場合と比べて弾が届くフレームはkまでしかずれないので、予測したxのずれも
+    kフレームの間に敵が動ける回数まで。自機に近い列から順に見て、そのずれを引いても最善より遠い列まで来たら打ち切れる。
+    ただし撃つと弾が降下する敵とすれ違うフレームだけは予測が大きく飛ぶので、そのフレームに見る敵として別に持つ。
+    """
+
+    def __init__(self, refresh_frames: int = 96) -> None:
+        self.refresh_frames = refresh_frames
+        self.clear()
+
+    def clear(self) -> None:
+        self.columns: list[set[int]] = []
+        # id → (予測した列(毎回見る敵は-1), 敵のリストでの順番)
+        self.entries: dict[int, tuple[int, int]] = {}
+        # 予測し直す順(古い順)の(予測したときの移動カウント, id)
+        self.queue: deque[tuple[int, int]] = deque()
+        # 移動カウント → そのとき撃つと予測が飛ぶ敵のid(キーは古い順にヒープでも持つ)
+        self.jumps: dict[int, set[int]] = {}
+        self.jump_counts: list[int] = []
+        # 予測し直すまで毎回見る敵(予測したときにすれ違っていたり、自機のすぐ上まで降りてくる敵)
+        self.volatile: set[int] = set()
+        self.moved_count = 0
+
+    def build(self, enemies: Sequence[BaseEnemy], player_y: int, screen_size: tuple[int, int]) -> None:
+        self.clear()
+        self.columns = [set() for _ in range(screen_size[0])]
+        # 敵はみんな同じステップ数だけ進むので、どの敵の移動カウントも時刻として使える
+        self.moved_count = enemies[0].moved_count
+        for order, enemy in enumerate(enemies):
+            self._add(enemy, order, player_y, screen_size)
+
+    def refresh(
+        self, enemy_index: Mapping[int, BaseEnemy], moved_count: int, player_y: int, screen_size: tuple[int, int]
+    ) -> int:
+        """古い予測を予測し直し、残っている予測のうち一番古いものからのフレーム数を返す"""
+        self.moved_count = moved_count
+        # 毎フレーム選ぶなら、refresh_framesフレームで全部を1回ずつ予測し直す量
+        budget = -(-len(self.entries) // self.refresh_frames)
+        stale = moved_count - self.refresh_frames
+        queue = self.queue
+        while queue and queue[0][0] < moved_count and (budget > 0 or queue[0][0] <= stale):
+            _, enemy_id = queue.popleft()
+            entry = self.entries.get(enemy_id)
+            if entry is None:
+                continue
+            self.remove(enemy_id)
+            enemy = enemy_index.get(enemy_id)
+            if enemy is not None:
+                self._add(enemy, entry[1], player_y, screen_size)
+                budget -= 1
+
+        jump_counts = self.jump_counts
+        while jump_counts and jump_counts[0] < moved_count:
+            self.jumps.pop(heappop(jump_counts), None)
+        return moved_count - queue[0][0] if queue else 0
+
+    def remove(self, enemy_id: int) -> None:
+        column, _ = self.entries.pop(enemy_id)
+        if column < 0:
+            self.volatile.discard(enemy_id)
+        else:
+            self.columns[column].discard(enemy_id)
+
+    def _add(self, enemy: BaseEnemy, order: int, player_y: int, screen_size: tuple[int, int]) -> None:
+        enemy_id = enemy.id
+        y = enemy.position[1]
+        pred_x, _ = predict_intersection(
+            enemy.position, enemy.move_direction, enemy.moved_count, enemy.move_count, player_y, screen_size
+        )
+        descents = descent_frames(
+            enemy.position, enemy.move_direction, enemy.moved_count, enemy.move_count, screen_size,
+            self.refresh_frames + screen_size[1] + 2,
+        )
+        # 自機のすぐ上まで降りてくると、どのフレームで撃っても交差しなくなり予測が飛ぶ
+        volatile = y - len(descents) - player_y <= 1
+        for downs, down_frame in enumerate(descents):
+            # このフレームに撃つと、弾が敵の降下とちょうどすれ違う
+            frame = down_frame - (y - downs - player_y)
+            if frame == 0:
+                volatile = True
+            elif 0 < frame <= self.refresh_frames:
+                moved_count = self.moved_count + frame
+                if moved_count not in self.jumps:
+                    self.jumps[moved_count] = set()
+                    heappush(self.jump_counts, moved_count)
+                self.jumps[moved_count].add(enemy_id)
+
+        if volatile:
+            self.entries[enemy_id] = (-1, order)
+            self.volatile.add(enemy_id)
+        else:
+            self.entries[enemy_id] = (pred_x, order)
+            self.columns[pred_x].add(enemy_id)
+        self.queue.append((self.moved_count, enemy_id))
 
 
 class PredictStrategy(BasePlayerStrategy):
+    """狙う敵を1体決め、そこへ移動して撃つまでの行動列(計画)を1度だけ作って順に返す。
+
+    敵の動きは決まっているので、計画を作り直すのは撃ち終わったときと狙った敵が倒されたとき、
+    自機が計画どおりの位置にいないときだけ。それ以外のフレームは計画から1つ取り出すだけで済む。
+    敵が密集していると撃ってすぐ次の敵を選ぶので、敵選びは交差予測の列ごとの索引(_PredictedColumns)を
+    フレームをまたいで使い回し、自機に近い列の敵だけを予測し直して比べる。
+    """
+
     def __init__(self) -> None:
         super().__init__()
-        self.target_enemy_id: str | None = None
-        self.shooted_enemys: list[tuple[int, str]] = []
+        self.target_enemy_id: int | None = None
+        # 撃った敵のid → 弾が届くフレーム(それまではその敵を狙わない)
+        self.shots_in_flight: dict[int, int] = {}
+        # (弾が届くフレーム, id)のヒープ。届いた分をshots_in_flightから捨てるのに使う
+        self.shot_arrivals: list[tuple[int, int]] = []
+        self.frame = 0
+        # (そのフレームでいるはずの自機のx, 行動)の列
+        self.plan: deque[tuple[int, PLAYER_ACTIONS]] = deque()
+        # 計画の最後に撃った弾が届くまでのフレーム数(Noneなら撃っても狙い続ける)
+        self.plan_hit_frames: int | None = None
+        self.columns = _PredictedColumns()
 
     name = "Predict"
 
     def reset(self) -> None:
         self.target_enemy_id = None
-        self.shooted_enemys.clear()
+        self.shots_in_flight.clear()
+        self.shot_arrivals.clear()
+        self.frame = 0
+        self.plan.clear()
+        self.columns.clear()
 
     def _target_enemy(
         self,
-        enemies: list[BaseEnemy],
+        enemies: Sequence[BaseEnemy],
+        enemy_index: Mapping[int, BaseEnemy],
         player_position: tuple[int, int],
         screen_size: tuple[int, int],
     ) -> BaseEnemy | None:
-        # すでにターゲットにしている敵がいればそれを返す
+        # すでにターゲットにしている敵がいれば索引から引いて返す
         if self.target_enemy_id is not None:
-            for e in enemies:
-                if e.id == self.target_enemy_id:
-                    return e
+            target = enemy_index.get(self.target_enemy_id)
+            if target is not None:
+                return target
+        if not enemies:
+            return None
 
-        # すでに撃った(弾が上昇中の)敵は除外し、交差予測に基づき最も横移動距離の少ない敵を選ぶ
-        shot_ids = {enemy_id for _, enemy_id in self.shooted_enemys}
-        candidates: list[tuple[tuple[int, int, int], BaseEnemy]] = []
-        for e in enemies:
-            if e.id in shot_ids:
-                continue
-            pred_x, pred_bullet_y = self._predict_intersection_x(e, player_position[1], screen_size)
-            dx = abs(pred_x - player_position[0])                 # 交差時点の必要横移動距離
-            eta = max(0, pred_bullet_y - player_position[1])      # 到達までのフレーム数(小さい方を優先)
-            # tie-breaker: 高い位置(画面上側)の敵ほど優先度を下げる/上げる等は設計次第。ここでは手前(大きいy)優先。
-            tie = -e.position[1]
-            candidates.append(((dx, eta, tie), e))
-
-        if not candidates:
+        # 弾が届いた分を捨てる
+        shots_in_flight, shot_arrivals = self.shots_in_flight, self.shot_arrivals
+        while shot_arrivals and shot_arrivals[0][0] <= self.frame:
+            frame, enemy_id = heappop(shot_arrivals)
+            if shots_in_flight.get(enemy_id) == frame:
+                del shots_in_flight[enemy_id]
+
+        # 索引に無い敵がいれば新しいゲーム、移動カウントが戻っていれば巻き戻されたので、索引を作り直す
+        columns = self.columns
+        first = enemies[0]
+        if first.id not in columns.entries or first.moved_count < columns.moved_count:
+            columns.build(enemies, player_position[1], screen_size)
+        best = self._search_columns(enemy_index, player_position, screen_size, first)
+        if best is None:
             return None
 
-        best = min(candidates, key=lambda x: x[0])[1]
         self.target_enemy_id = best.id
         return best
 
+    def _search_columns(
+        self,
+        enemy_index: Mapping[int, BaseEnemy],
+        player_position: tuple[int, int],
+        screen_size: tuple[int, int],
+        first: BaseEnemy,
+    ) -> BaseEnemy | None:
+        # すでに撃った(弾が上昇中の)敵は除外し、交差予測に基づき最も横移動距離の少ない敵を選ぶ
+        columns = self.columns
+        player_x, player_y = player_position
+        width = screen_size[0]
+        moved_count = first.moved_count
+        age = columns.refresh(enemy_index, moved_count, player_y, screen_size)
+        entries = columns.entries
+        best: tuple[tuple[int, int, int, int], BaseEnemy] | None = None
+
+        def consider(enemy_ids: Iterable[int]) -> None:
+            nonlocal best
+            for enemy_id in tuple(enemy_ids):
+                if enemy_id in self.shots_in_flight or enemy_id not in entries:
+                    continue
+                e = enemy_index.get(enemy_id)
+                if e is None:
+                    columns.remove(enemy_id)
+                    continue
+                pred_x, pred_bullet_y = self._predict_intersection_x(e, player_y, screen_size)
+                dx = abs(pred_x - player_x)                 # 交差時点の必要横移動距離
+                eta = max(0, pred_bullet_y - player_y)      # 到達までのフレーム数(小さい方を優先)
+                # tie-breaker: 高い位置(画面上側)の敵ほど優先度を下げる/上げる等は設計次第。ここでは手前(大きいy)優先。
+                # 全部同じならリストで先にいる敵
+                key = (dx, eta, -e.position[1], entries[enemy_id][1])
+                if best is None or key < best[0]:
+                    best = (key, e)
+
+        consider(columns.jumps.get(moved_count, ()))
+        consider(columns.volatile)
+        # 予測してからageフレームの間に、予測したxはこれだけずれうる
+        drift = -(-age // first.move_count) if first.move_count > 0 else 0
+        distance = 0
+        while best is None or distance - drift <= best[0][0]:
+            left, right = player_x - distance, player_x + distance
+            if left < 0 and right >= width:
+                break
+            if left >= 0:
+                consider(columns.columns[left])
+            if distance and right < width:
+                consider(columns.columns[right])
+            distance += 1
+
+        return None if best is None else best[1]
+
     def _predict_intersection_x(self, enemy: BaseEnemy, player_y: int, screen_size: tuple[int, int]) -> tuple[int, int]:
-        """弾がplayer_yから上昇し、敵と同じyに到達する時点の敵xをシミュレーションで求める。
-        GameModelの更新順序(敵move→弾move→当たり判定)に合わせて進める。
+        """弾がplayer_yから上昇し、敵と同じyに到達する時点の敵xを求める。
+        GameModelの更新順序(敵move→弾move→当たり判定)に合わせた結果を、盤面幅ごとの移動周期表から計算する。
         返り値は予測される敵のx座標と当たるまでのフレーム数。
         """
-        width, height = screen_size
-        ex, ey = enemy.position
-        direction = enemy.move_direction
-        moved = enemy.moved_count
-        move_count = enemy.move_count
-
-        bullet_y = player_y
-
-        # 最大でも画面高分だけ進めば十分
-        for _ in range(height + 2):
-            # 敵の更新(このフレームで移動するか判定)
-            moved += 1
-            if move_count > 0 and moved % move_count == 0:
-                match direction:
-                    case "left":
-                        if ex > 0:
-                            ex -= 1
-                        else:
-                            direction = "down"
-                    case "right":
-                        if ex < width - 1:
-                            ex += 1
-                        else:
-                            direction = "down"
-                    case "down":
-                        ey -= 1
-                        direction = "left" if ex > width // 2 else "right"
-
-            # 弾の更新
-            bullet_y += 1
-
-            # 当たり判定(同じyに到達した時点で交差を想定)
-            if bullet_y == ey:
-                return ex, bullet_y
-
-        # フォールバック: シミュレーションしきれない場合は現在位置
-        return ex, bullet_y
+        return predict_intersection(
+            enemy.position, enemy.move_direction, enemy.moved_count, enemy.move_count, player_y, screen_size
+        )
 
-    def decide_action(self, game_state):
-        player_position = game_state["player"]["position"]
+    def _make_plan(self, game_state: GameState) -> None:
+        """狙う敵のコピーを1フレームずつ動かしながら、今撃てば当たる位置まで寄って撃つ計画を作る"""
+        self.plan.clear()
+        player_x, player_y = game_state["player"]["position"]
         screen_size = game_state["stage"]["screen_size"]
+        width = screen_size[0]
 
-        for index, (bullet_y, enemy_id) in enumerate(self.shooted_enemys):
-            if bullet_y - player_position[1] <= 0:
-                self.shooted_enemys.pop(index)
-            else:
-                self.shooted_enemys[index] = (bullet_y - 1, enemy_id)
-
-        enemy = self._target_enemy(game_state["stage"]["enemies"], game_state["player"]["position"], screen_size)
+        target = self._target_enemy(
+            game_state["stage"]["enemies"], game_state["stage"]["enemy_index"], (player_x, player_y), screen_size
+        )
+        if target is None:
+            return
 
-        if enemy is None:
-            return "none"
+        enemy = copy(target)
+        # 追いつけない敵の計画が長くなりすぎないように区切る(使い切ったら続きを作り直す)
+        for _ in range(width + screen_size[1]):
+            target_x, bullet_y = self._predict_intersection_x(enemy, player_y, screen_size)
+            if target_x == player_x:
+                self.plan.append((player_x, "shoot"))
+                # 端に張り付いているときは撃っても記録せず、同じ敵を狙い続ける
+                self.plan_hit_frames = None if player_x in (0, width - 1) else bullet_y - player_y
+                return
 
-        target_x, bullet_y = self._predict_intersection_x(enemy, player_position[1], screen_size)
+            action: PLAYER_ACTIONS = "left" if target_x < player_x else "right"
+            self.plan.append((player_x, action))
+            player_x += -1 if action == "left" else 1
+            enemy.move(width)
 
-        # 端での挙動(画面外予測はしないが、端に張り付いた時は撃つ)
-        if player_position[0] in (0, screen_size[0] - 1):
-            if player_position[0] == target_x:
-                return "shoot"
+    def decide_action(self, game_state):
+        self.frame += 1
+        plan = self.plan
+        if not (
+            plan
+            and plan[0][0] == game_state["player"]["position"][0]
+            and self.target_enemy_id in game_state["stage"]["enemy_index"]
+        ):
+            self._make_plan(game_state)
+            if not plan:
+                return "none"
 
-        if target_x < player_position[0]:
-            return "left"
-        elif target_x > player_position[0]:
-            return "right"
-        else:
-            self.shooted_enemys.append((bullet_y, enemy.id))
+        _, action = plan.popleft()
+        if action == "shoot" and not plan and self.plan_hit_frames is not None:
+            arrival = self.frame + self.plan_hit_frames + 1
+            self.shots_in_flight[self.target_enemy_id] = arrival
+            heappush(self.shot_arrivals, (arrival, self.target_enemy_id))
             self.target_enemy_id = None
-            return "shoot"
+        return action
 
 
 class MidareutiStrategy(BasePlayerStrategy):
@@ -145,7 +310,93 @@ class MidareutiStrategy(BasePlayerStrategy):
         return self.directions[self.direction_count % 2]
 
 
-player_strategys: tuple[BasePlayerStrategy, ...] = (
-    PredictStrategy(),
-    MidareutiStrategy(),
-)
+class LookaheadStrategy(BasePlayerStrategy):
+    """盤面のコピーの上で行動列をビームサーチする戦略。
+
+    各ノードは行動を1つ進めたあと、弾が届くまで"none"で先読みした時点のスコアで評価する。
+    同点なら、生き残った敵の交差予測位置に近いほど良いとする。
+    """
+
+    name = "Lookahead"
+
+    def __init__(self, depth: int = 2, beam_width: int = 3, node_budget: int = 2000) -> None:
+        super().__init__()
+        self.depth = depth
+        self.beam_width = beam_width
+        # 1回の判断でシミュレーションしてよいステップ数の上限(先読み分も含む)
+        self.node_budget = node_budget
+        # 今の判断で使ったステップ数
+        self._spent = 0
+        self._sandbox: GameModel | None = None
+
+    def reset(self) -> None:
+        self._sandbox = None
+
+    def _load_sandbox(self, game_state: GameState) -> GameModel:
+        stage_state = game_state["stage"]
+        if self._sandbox is None or self._sandbox.gamestate["stage"]["screen_size"] != stage_state["screen_size"]:
+            self._sandbox = GameModel(SandboxStage(stage_state["screen_size"]))
+
+        # 敵はコピーしておけば、サンドボックスの中で何度でもsnapshot/restoreできる
+        self._sandbox.stage.load_state([copy(enemy) for enemy in stage_state["enemies"]], stage_state["bullets"], [])
+        self._sandbox.gamestate["player"]["position"] = game_state["player"]["position"]
+        return self._sandbox
+
+    def _evaluate(self, sandbox: GameModel, rollout: int) -> tuple[int, int]:
+        stage_state = sandbox.gamestate["stage"]
+        # 先読みも上限の残りまでしか進めない
+        rollout = min(rollout, self.node_budget - self._spent)
+        steps = 0
+        while steps < rollout and stage_state["bullets"] and not sandbox.is_game_over:
+            sandbox.step("none")
+            steps += 1
+        self._spent += steps
+
+        if stage_state["enemy_count"] and sandbox.is_game_over:
+            # デッドラインを越えられるのは最悪
+            return -(1 << 30), 0
+
+        player_x, player_y = sandbox.gamestate["player"]["position"]
+        distance = min(
+            (
+                abs(predict_intersection(
+                    enemy.position, enemy.move_direction, enemy.moved_count, enemy.move_count,
+                    player_y, stage_state["screen_size"],
+                )[0] - player_x)
+                for enemy in stage_state["enemies"]
+            ),
+            default=0,
+        )
+        return stage_state["total_score"], -distance
+
+    def decide_action(self, game_state: GameState) -> PLAYER_ACTIONS:
+        sandbox = self._load_sandbox(game_state)
+        screen_height = game_state["stage"]["screen_size"][1]
+        rollout = screen_height - game_state["player"]["position"][1] + 1
+        self._spent = 0
+
+        best: tuple[tuple[int, int], PLAYER_ACTIONS] | None = None
+        beam: list[tuple[PLAYER_ACTIONS | None, GameSnapshot]] = [(None, sandbox.snapshot())]
+        for _ in range(self.depth):
+            children: list[tuple[tuple[int, int], PLAYER_ACTIONS, GameSnapshot]] = []
+            for first_action, snapshot in beam:
+                for action in ACTIONS_BY_CODE:
+                    if self._spent >= self.node_budget:
+                        break
+                    sandbox.restore(snapshot)
+                    sandbox.step(action)
+                    self._spent += 1
+                    child = sandbox.snapshot()
+                    value = self._evaluate(sandbox, rollout)
+                    children.append((value, first_action or action, child))
+
+            if not children:
+                break
+
+            children.sort(key=lambda child: child[0], reverse=True)
+            if best is None or children[0][0] > best[0]:
+                best = (children[0][0], children[0][1])
+            beam = [(first_action, snapshot) for _, first_action, snapshot in children[:self.beam_width]]
+
+        return "none" if best is None else best[1]
+
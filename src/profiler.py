@@ -0,0 +1,87 @@
+import json
+from collections import deque
+from time import perf_counter
+from typing import TypedDict
+
+
+class PhaseSummary(TypedDict):
+    count: int
+    mean_us: float
+    p50_us: float
+    p99_us: float
+
+
+class ProfileSummary(TypedDict):
+    steps_per_sec: float
+    phases: dict[str, PhaseSummary]
+    counters: dict[str, int]
+
+
+class Profiler:
+    """フェーズごとの処理時間を直近window件だけ覚えておき、p50/p99などを出す。
+
+    GameModel.set_profiler()で付けたときだけ計測される。付けていないときは
+    各フェーズで`profiler is None`を見るだけなので、ほとんど負荷はかからない。
+    """
+
+    def __init__(self, window: int = 1000) -> None:
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        self.samples: dict[str, deque[float]] = {}
+        self.totals: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+        self._step_times: deque[float] = deque(maxlen=self.window)
+
+    def record(self, phase: str, seconds: float) -> None:
+        samples = self.samples.get(phase)
+        if samples is None:
+            samples = self.samples[phase] = deque(maxlen=self.window)
+            self.totals[phase] = 0
+        samples.append(seconds)
+        self.totals[phase] += 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def step(self) -> None:
+        self._step_times.append(perf_counter())
+        self.count("steps")
+
+    @property
+    def steps_per_sec(self) -> float:
+        if len(self._step_times) < 2:
+            return 0.0
+        elapsed = self._step_times[-1] - self._step_times[0]
+        return (len(self._step_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> ProfileSummary:
+        phases: dict[str, PhaseSummary] = {}
+        for phase, samples in self.samples.items():
+            ordered = sorted(samples)
+            phases[phase] = {
+                "count": self.totals[phase],
+                "mean_us": sum(ordered) / len(ordered) * 1e6,
+                "p50_us": ordered[int((len(ordered) - 1) * 0.5)] * 1e6,
+                "p99_us": ordered[int((len(ordered) - 1) * 0.99)] * 1e6,
+            }
+
+        return {
+            "steps_per_sec": self.steps_per_sec,
+            "phases": phases,
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def format_lines(self) -> list[str]:
+        """HUD用の短い表示"""
+        summary = self.summary()
+        lines = [f"steps/sec: {summary['steps_per_sec']:.0f}"]
+        for phase, stats in summary["phases"].items():
+            lines.append(f"{phase}: p50 {stats['p50_us']:.0f}us p99 {stats['p99_us']:.0f}us")
+        for name, value in summary["counters"].items():
+            lines.append(f"{name}: {value}")
+        return lines
@@ -0,0 +1,77 @@
+from asciimatics.constants import COLOUR_WHITE
+from asciimatics.screen import Screen
+
+Cell = tuple[str, int]
+
+
+class DirtyRenderer:
+    """前のフレームで描いたセルを覚えておき、変わったセルだけをスクリーンに書くレンダラ。
+
+    毎フレームput()で動くもの(自機・敵・弾など)を積んでflush()すると、
+    前フレームとの差分だけをprint_atする。消えたセルは背景(デッドラインやHUD)に戻す。
+    """
+
+    def __init__(self, screen: Screen) -> None:
+        self.screen = screen
+        self._background: dict[tuple[int, int], Cell] = {}
+        self._previous: dict[tuple[int, int], Cell] = {}
+        self._current: dict[tuple[int, int], Cell] = {}
+        self._texts: dict[str, tuple[str, int, int, int]] = {}
+
+    def invalidate(self) -> None:
+        """画面全体を描き直す(リサイズや画面の切り替え時用)"""
+        self.screen.clear_buffer(COLOUR_WHITE, 0, 0)
+        for (x, y), (char, colour) in self._background.items():
+            self.screen.print_at(char, x, y, colour=colour)
+        self._previous.clear()
+
+    def clear(self) -> None:
+        """背景やHUDも忘れて画面を真っさらにする(背景を描き直す前用)"""
+        self._background.clear()
+        self._texts.clear()
+        self.invalidate()
+
+    def background(self, text: str, x: int, y: int, colour: int = COLOUR_WHITE) -> None:
+        """動かないものを背景として描く"""
+        for i, char in enumerate(text):
+            self._background[(x + i, y)] = (char, colour)
+            self._previous.pop((x + i, y), None)
+        self.screen.print_at(text, x, y, colour=colour)
+
+    def text(self, key: str, text: str, x: int, y: int, colour: int = COLOUR_WHITE) -> None:
+        """HUDなどの文字列。内容が変わったときだけ描き直す"""
+        old = self._texts.get(key)
+        if old == (text, x, y, colour):
+            return
+
+        if old is not None:
+            old_text, old_x, old_y, _ = old
+            for i in range(len(old_text)):
+                self._background.pop((old_x + i, old_y), None)
+            if (old_x, old_y) != (x, y) or len(old_text) > len(text):
+                self.screen.print_at(" " * len(old_text), old_x, old_y)
+
+        self._texts[key] = (text, x, y, colour)
+        self.background(text, x, y, colour)
+
+    def put(self, char: str, x: int, y: int, colour: int = COLOUR_WHITE) -> None:
+        self._current[(x, y)] = (char, colour)
+
+    def put_text(self, text: str, x: int, y: int, colour: int = COLOUR_WHITE) -> None:
+        for i, char in enumerate(text):
+            self._current[(x + i, y)] = (char, colour)
+
+    def flush(self) -> None:
+        screen = self.screen
+        previous, current = self._previous, self._current
+
+        for position, cell in current.items():
+            if previous.get(position) != cell:
+                screen.print_at(cell[0], *position, colour=cell[1])
+
+        for position in previous.keys() - current.keys():
+            char, colour = self._background.get(position, (" ", COLOUR_WHITE))
+            screen.print_at(char, *position, colour=colour)
+
+        self._previous, self._current = current, {}
+        screen.refresh()
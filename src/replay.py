@@ -0,0 +1,252 @@
+import json
+import struct
+import zlib
+from bisect import bisect_right
+from typing import BinaryIO, TextIO, TypedDict
+
+from src.game import GameModel
+from src.stage import ENEMY_RECORD, InvaderStage
+from src.type.abstracts import BaseEnemy
+from src.type.constants import ACTION_CODES, ACTIONS_BY_CODE, PLAYER_ACTIONS
+
+# ファイル形式(リトルエンディアン):
+#   MAGIC
+#   b"G" <QII>  ゲーム開始: シード, 盤面の幅, 高さ
+#   b"A" <I>    行動: 個数 + 1行動2bitで詰めたバイト列
+#   b"K" <II>   キーフレーム: そのステップ数, zlib圧縮した状態の長さ + 状態
+#   b"R" <I>    巻き戻し: このステップより後の行動とキーフレームを捨てる(そこから別の行動で続いた)
+#   b"E" <I>    ゲーム終了: 総ステップ数
+MAGIC = b"CUIR\x01"
+
+def encode_keyframe(game: GameModel, level: int = 6) -> bytes:
+    """ゲームの状態を圧縮したバイト列にする。敵はステージが詰める(InvaderStageとその派生だけを扱う)。
+    levelはzlibの圧縮レベルで、ファイルに残すときは小ささ、メモリに持つだけなら速さを優先して選ぶ
+    """
+    player = game.gamestate["player"]
+    stage = game.gamestate["stage"]
+    scores = stage["scores"]
+    bullets = stage["bullets"]
+
+    chunks = [
+        struct.pack("<iiiI", *player["position"], player["bullet_cooldown"], len(scores)),
+        struct.pack(f"<{len(scores)}i", *scores),
+        struct.pack("<I", len(bullets)),
+        struct.pack(f"<{len(bullets) * 2}i", *(value for bullet in bullets for value in bullet)),
+        struct.pack("<I", stage["enemy_count"]),
+        game.stage.pack_enemies(),  # type: ignore[attr-defined]
+    ]
+    return zlib.compress(b"".join(chunks), level)
+
+
+def decode_keyframe(game: GameModel, payload: bytes) -> None:
+    data = zlib.decompress(payload)
+    x, y, bullet_cooldown, score_count = struct.unpack_from("<iiiI", data)
+    offset = 16
+    scores = struct.unpack_from(f"<{score_count}i", data, offset)
+    offset += 4 * score_count
+    (bullet_count,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    values = struct.unpack_from(f"<{bullet_count * 2}i", data, offset)
+    bullets = list(zip(values[::2], values[1::2]))
+    offset += 8 * bullet_count
+    (enemy_count,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+
+    records = data[offset:offset + ENEMY_RECORD.size * enemy_count]
+
+    game.gamestate["player"]["position"] = (x, y)
+    game.gamestate["player"]["bullet_cooldown"] = bullet_cooldown
+    game.stage.load_packed_state(records, bullets, scores)  # type: ignore[attr-defined]
+
+
+class ReplayRecorder:
+    """GameModelのステップフックとして、行動を2bitずつストリームに書き出す。
+    keyframe_intervalステップごとに状態全体(キーフレーム)も書き、シークに使う。
+    RewindBufferなどで巻き戻したところからゲームが続いたときは、巻き戻しの印を書いてその先を記録し直す。
+    渡したファイルはclose()で閉じる。
+    """
+
+    def __init__(self, file: BinaryIO, keyframe_interval: int = 1000) -> None:
+        self.file = file
+        self.keyframe_interval = keyframe_interval
+        self._actions = bytearray()
+        self._action_count = 0
+        self._steps = 0
+        self._recording = False
+        file.write(MAGIC)
+
+    def attach(self, game: GameModel) -> None:
+        game.step_hooks.append(self.on_step)
+
+    def detach(self, game: GameModel) -> None:
+        game.step_hooks.remove(self.on_step)
+
+    def on_step(self, game: GameModel, action: PLAYER_ACTIONS, destroyed: list[tuple[BaseEnemy, int]]) -> None:
+        if game.step_count == 1:
+            # 新しいゲームが始まった(途中で止まったゲームがあれば閉じておく)
+            self._end_game()
+            width, height = game.gamestate["stage"]["screen_size"]
+            self.file.write(b"G" + struct.pack("<QII", game.seed, width, height))
+            self._recording = True
+        elif not self._recording:
+            # ゲームの途中からは記録できない(シードから再現できないので)
+            return
+        elif game.step_count - 1 < self._steps:
+            # 巻き戻したところから続いたので、読むときにその先を捨てさせる
+            self._flush_actions()
+            self.file.write(b"R" + struct.pack("<I", game.step_count - 1))
+        elif game.step_count - 1 > self._steps:
+            # 記録していないステップを飛ばされたら再現できないので、そこまでで閉じる
+            self._end_game()
+            return
+
+        code = ACTION_CODES[action]
+        index = self._action_count % 4
+        if index == 0:
+            self._actions.append(code)
+        else:
+            self._actions[-1] |= code << (index * 2)
+        self._action_count += 1
+        self._steps = game.step_count
+
+        if game.is_game_over:
+            self._end_game()
+        elif game.step_count % self.keyframe_interval == 0:
+            self._flush_actions()
+            payload = encode_keyframe(game)
+            self.file.write(b"K" + struct.pack("<II", game.step_count, len(payload)) + payload)
+
+    def _flush_actions(self) -> None:
+        if self._action_count:
+            self.file.write(b"A" + struct.pack("<I", self._action_count) + self._actions)
+            self._actions.clear()
+            self._action_count = 0
+
+    def _end_game(self) -> None:
+        if self._recording:
+            self._flush_actions()
+            self.file.write(b"E" + struct.pack("<I", self._steps))
+            self._recording = False
+
+    def close(self) -> None:
+        self._end_game()
+        self.file.close()
+
+
+class ReplayGame(TypedDict):
+    seed: int
+    screen_size: tuple[int, int]
+    steps: int
+    actions: bytearray
+    # (ステップ数, ファイル上の位置, 長さ)
+    keyframes: list[tuple[int, int, int]]
+
+
+class ReplayReader:
+    """リプレイファイルを先頭から1度だけ読んで、ゲームごとの行動とキーフレームの位置を索引する。
+    キーフレームの中身はシーク時に必要な分だけ読む。
+    """
+
+    def __init__(self, file: BinaryIO) -> None:
+        self.file = file
+        self.games: list[ReplayGame] = []
+
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a replay file.")
+
+        game: ReplayGame | None = None
+        while tag := file.read(1):
+            match tag:
+                case b"G":
+                    seed, width, height = struct.unpack("<QII", file.read(16))
+                    game = {
+                        "seed": seed,
+                        "screen_size": (width, height),
+                        "steps": 0,
+                        "actions": bytearray(),
+                        "keyframes": [],
+                    }
+                    self.games.append(game)
+                case b"A" if game is not None:
+                    (count,) = struct.unpack("<I", file.read(4))
+                    packed = file.read((count + 3) // 4)
+                    for i in range(count):
+                        game["actions"].append((packed[i // 4] >> (i % 4 * 2)) & 3)
+                    game["steps"] = len(game["actions"])
+                case b"K" if game is not None:
+                    step, size = struct.unpack("<II", file.read(8))
+                    game["keyframes"].append((step, file.tell(), size))
+                    file.seek(size, 1)
+                case b"R" if game is not None:
+                    (step,) = struct.unpack("<I", file.read(4))
+                    del game["actions"][step:]
+                    game["keyframes"] = [keyframe for keyframe in game["keyframes"] if keyframe[0] <= step]
+                    game["steps"] = len(game["actions"])
+                case b"E" if game is not None:
+                    (game["steps"],) = struct.unpack("<I", file.read(4))
+                    game = None
+                case _:
+                    raise ValueError(f"Broken replay file at {file.tell() - 1}.")
+
+
+class ReplayPlayer:
+    """記録された1ゲームを再生する。seek()は直前のキーフレームに飛んでから再シミュレーションする"""
+
+    def __init__(self, reader: ReplayReader, game_index: int = 0) -> None:
+        self.reader = reader
+        self.replay = reader.games[game_index]
+        self.game = GameModel(InvaderStage(self.replay["screen_size"]), self.replay["seed"])
+        self._keyframe_steps = [step for step, _, _ in self.replay["keyframes"]]
+
+    @property
+    def position(self) -> int:
+        return self.game.step_count
+
+    @property
+    def length(self) -> int:
+        return self.replay["steps"]
+
+    def action(self, step: int) -> PLAYER_ACTIONS:
+        return ACTIONS_BY_CODE[self.replay["actions"][step]]
+
+    def step(self) -> list[tuple[BaseEnemy, int]]:
+        if self.position >= self.length:
+            return []
+        return self.game.step(self.action(self.position))
+
+    def seek(self, step: int) -> None:
+        step = max(0, min(step, self.length))
+        keyframe = bisect_right(self._keyframe_steps, step) - 1
+
+        # 前に進むだけで、間にキーフレームが無いならそのまま進める
+        forward = self.position <= step and (keyframe < 0 or self._keyframe_steps[keyframe] <= self.position)
+        if not forward:
+            if keyframe < 0:
+                self.game.initialize_game(self.replay["seed"])
+            else:
+                keyframe_step, offset, size = self.replay["keyframes"][keyframe]
+                self.reader.file.seek(offset)
+                decode_keyframe(self.game, self.reader.file.read(size))
+                self.game.step_count = keyframe_step
+
+        while self.position < step:
+            self.step()
+
+
+def export_replay(replay: ReplayPlayer, file: TextIO, start: int = 0) -> None:
+    """startステップ目から最後まで、1ステップ1行のJSON Linesで書き出す"""
+    replay.seek(start)
+    while replay.position < replay.length:
+        action = replay.action(replay.position)
+        destroyed = replay.step()
+        stage = replay.game.gamestate["stage"]
+        file.write(json.dumps({
+            "step": replay.position,
+            "action": action,
+            "player": replay.game.gamestate["player"]["position"],
+            "enemies": stage["enemy_count"],
+            "bullets": len(stage["bullets"]),
+            "lowest_enemy_y": stage["lowest_enemy_y"],
+            "score": stage["total_score"],
+            "destroyed": [[*enemy.position, score] for enemy, score in destroyed],
+        }) + "\n")
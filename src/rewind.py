@@ -0,0 +1,99 @@
+from bisect import bisect_right
+from collections import deque
+
+from src.game import GameModel
+from src.replay import decode_keyframe, encode_keyframe
+from src.type.abstracts import BaseEnemy
+from src.type.constants import ACTION_CODES, ACTIONS_BY_CODE, PLAYER_ACTIONS
+
+# キーフレームのzlib圧縮レベル(10000x2000の盤面で既定の6だと1回0.1秒を超える)
+KEYFRAME_LEVEL = 1
+
+
+class RewindBuffer:
+    """直近capacityステップを巻き戻せるように、GameModelのステップフックとしてメモリに記録する。
+
+    ゲームは行動が決まれば結果も決まるので、1ステップの差分は行動コード1バイトで足りる
+    (自機の移動、撃った弾、倒した敵、敵の移動はそこから再シミュレーションで求まる)。
+    行動はcapacityバイトのリングバッファに、keyframe_intervalステップごとの状態は
+    replayと同じ形式のキーフレームで持ち、古いものから捨てるので、ゲームが長くてもメモリは一定。
+    キーフレームはゲームを進める間に作るので、ファイルに残すreplayより軽い圧縮レベルを使う。
+    """
+
+    def __init__(self, capacity: int = 5000, keyframe_interval: int = 250) -> None:
+        if keyframe_interval > capacity:
+            raise ValueError("keyframe_interval must not be larger than capacity.")
+        self.capacity = capacity
+        self.keyframe_interval = keyframe_interval
+        self._actions = bytearray(capacity)
+        # (ステップ数, キーフレーム)。ステップ数の昇順
+        self._keyframes: deque[tuple[int, bytes]] = deque()
+        self._newest = 0
+
+    def attach(self, game: GameModel) -> None:
+        game.step_hooks.append(self.on_step)
+
+    def detach(self, game: GameModel) -> None:
+        game.step_hooks.remove(self.on_step)
+
+    @property
+    def oldest(self) -> int:
+        """戻れる一番古いステップ"""
+        return self._keyframes[0][0] if self._keyframes else self._newest
+
+    @property
+    def newest(self) -> int:
+        """記録してある一番新しいステップ"""
+        return self._newest
+
+    def clear(self) -> None:
+        self._keyframes.clear()
+        self._newest = 0
+
+    def on_step(self, game: GameModel, action: PLAYER_ACTIONS, destroyed: list[tuple[BaseEnemy, int]]) -> None:
+        step = game.step_count
+        if not self.oldest <= step - 1 <= self._newest or step == 1:
+            # 新しいゲームか、記録の外から続いた(このステップから記録し直す)
+            self.clear()
+            self._newest = step
+            self._keyframes.append((step, encode_keyframe(game, KEYFRAME_LEVEL)))
+            return
+
+        if step - 1 < self._newest:
+            # 巻き戻したところから別の行動で進んだので、その先の記録は捨てる
+            while self._keyframes[-1][0] > step - 1:
+                self._keyframes.pop()
+
+        self._actions[(step - 1) % self.capacity] = ACTION_CODES[action]
+        self._newest = step
+
+        if step % self.keyframe_interval == 0:
+            self._keyframes.append((step, encode_keyframe(game, KEYFRAME_LEVEL)))
+        # 行動がリングバッファから消えたキーフレームからは進められないので捨てる
+        # (capacity >= keyframe_intervalなので、最後のキーフレームは必ず残る)
+        while self._keyframes[0][0] < step - self.capacity:
+            self._keyframes.popleft()
+
+    def seek(self, game: GameModel, step: int) -> int:
+        """gameを記録してあるstepの状態にする(範囲の外なら端に寄せる)。移動したステップを返す"""
+        if not self._keyframes:
+            return game.step_count
+        step = max(self.oldest, min(step, self._newest))
+        steps = [keyframe_step for keyframe_step, _ in self._keyframes]
+        keyframe = bisect_right(steps, step) - 1
+
+        # 前に進むだけで、間にキーフレームが無いならそのまま進める
+        current = game.step_count
+        if not (self.oldest <= current <= step and steps[keyframe] <= current):
+            keyframe_step, payload = self._keyframes[keyframe]
+            decode_keyframe(game, payload)
+            game.step_count = keyframe_step
+
+        # 記録やテレメトリに同じステップが二重に流れないように、再シミュレーション中はフックを外す
+        hooks, game.step_hooks = game.step_hooks, []
+        try:
+            while game.step_count < step:
+                game.step(ACTIONS_BY_CODE[self._actions[game.step_count % self.capacity]])
+        finally:
+            game.step_hooks = hooks
+        return step
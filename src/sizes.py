@@ -0,0 +1,10 @@
+"""盤面サイズ(WxH)の文字列を読む。コマンドラインとベンチマークで共通に使う"""
+
+
+def parse_size(value: str) -> tuple[int, int]:
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+def parse_sizes(value: str) -> list[tuple[int, int]]:
+    return [parse_size(size) for size in value.split(",")]
@@ -1,32 +1,72 @@
-from random import shuffle
+from struct import Struct
+from typing import Sequence
 
 from src.type.abstracts import BaseEnemy, BaseGameStage
 from src.enemy import InvaderEnemy
 
+# キーフレームでの敵1体分: x, y, 向き(ENEMY_DIRECTIONSの番号), 移動カウント, 体力
+ENEMY_RECORD = Struct("<iiBii")
+ENEMY_DIRECTIONS: tuple[str, ...] = ("left", "right", "down")
+
 
 class InvaderStage(BaseGameStage):
     name = "Invader Stage"
     description = "A stage where invader-type enemies appear."
 
-    def enemy_initialization(self) -> list[BaseEnemy]:
+    def _enemy_positions(self) -> list[tuple[int, int]]:
         screen_width, screen_height = self.stage_state["screen_size"]
 
         enemy_count = screen_height * (screen_height // 4) // 5
+        rows = 10 if screen_height > 20 else screen_height // 4
+        cells = rows * screen_width
 
-        screen_positions: list[tuple[int, int]] = []
-        for y in range(10 if screen_height > 20 else screen_height // 4):
-            for x in range(screen_width):
-                screen_positions.append((x, screen_height - y))
+        if enemy_count > cells:
+            enemy_count = cells
 
-        shuffle(screen_positions)
+        # 上からrows行のマスを番号で表し、全部のマスを作らずに必要な数だけ選ぶ
+        return [
+            (cell % screen_width, screen_height - cell // screen_width)
+            for cell in self.random.sample(range(cells), enemy_count)
+        ]
 
-        if enemy_count > len(screen_positions):
-            enemy_count = len(screen_positions)
+    def _enemy_directions(self, count: int) -> bytes:
+        """敵ごとの最初の向きを1体1bit(0: left, 1: right)で詰めたもの。乱数は1回だけ引く"""
+        return self.random.getrandbits(count).to_bytes((count + 7) // 8, "little") if count else b""
+
+    def enemy_initialization(self) -> list[BaseEnemy]:
+        positions = self._enemy_positions()
+        directions = self._enemy_directions(len(positions))
+        return [
+            InvaderEnemy(x, y, "right" if directions[i >> 3] >> (i & 7) & 1 else "left")
+            for i, (x, y) in enumerate(positions)
+        ]
 
-        enemys = []
+    def pack_enemies(self) -> bytes:
+        """敵を1体ずつENEMY_RECORDで詰めたバイト列(リプレイや巻き戻しのキーフレーム用)"""
+        return b"".join([
+            ENEMY_RECORD.pack(
+                *enemy.position, ENEMY_DIRECTIONS.index(enemy.move_direction), enemy.moved_count, enemy.hitpoint
+            )
+            for enemy in self.stage_state["enemies"]
+        ])
 
-        for _ in range(enemy_count):
-            x, y = screen_positions.pop()
-            enemys.append(InvaderEnemy(x, y))
+    def load_packed_state(
+        self,
+        records: bytes,
+        bullets: Sequence[tuple[int, int]],
+        scores: Sequence[int],
+    ) -> None:
+        """pack_enemies()のバイト列と弾、スコアからステージを組み立て直す"""
+        enemies: list[BaseEnemy] = [
+            InvaderEnemy(x, y, ENEMY_DIRECTIONS[direction], moved_count, hitpoint)  # type: ignore[arg-type]
+            for x, y, direction, moved_count, hitpoint in ENEMY_RECORD.iter_unpack(records)
+        ]
+        self.load_state(enemies, bullets, scores)
 
-        return enemys
+
+class SandboxStage(BaseGameStage):
+    name = "Sandbox Stage"
+    description = "An empty stage that is filled with load_state(), used for lookahead search."
+
+    def enemy_initialization(self) -> list[BaseEnemy]:
+        return []
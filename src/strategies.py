@@ -0,0 +1,68 @@
+from functools import cache
+from pkgutil import resolve_name
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from src.type.abstracts import BasePlayerStrategy
+
+# 外部のパッケージはこのグループのエントリポイントで戦略を足せる(名前 = "モジュール:クラス")
+ENTRY_POINT_GROUP = "cui_game.strategies"
+
+StrategyFactory = Callable[[], "BasePlayerStrategy"]
+
+DEFAULT_STRATEGY = "Predict"
+
+# 名前 → 戦略を作る関数か"モジュール:名前"。文字列のものは使うときに初めてimportする
+_factories: dict[str, StrategyFactory | str] = {
+    "Predict": "src.player:PredictStrategy",
+    "Midareuti": "src.player:MidareutiStrategy",
+    "Lookahead": "src.player:LookaheadStrategy",
+}
+_plugins_loaded = False
+
+
+def register_strategy(name: str, factory: StrategyFactory | str) -> None:
+    """戦略を名前で登録する。同じ名前があれば置き換える"""
+    _factories[name] = factory
+    get_strategy.cache_clear()
+
+
+def _load_plugins() -> None:
+    # importlib.metadataはimportするだけでも重いので、一覧が要るか知らない名前が来たときだけ読む
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+
+    from importlib.metadata import entry_points
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        _factories.setdefault(entry_point.name, entry_point.value)
+
+
+def strategy_names() -> list[str]:
+    """使える戦略の名前(組み込みが先、プラグインが後)。戦略はimportしない"""
+    _load_plugins()
+    return list(_factories)
+
+
+def has_strategy(name: str) -> bool:
+    if name not in _factories:
+        _load_plugins()
+    return name in _factories
+
+
+def create_strategy(name: str) -> "BasePlayerStrategy":
+    """名前から戦略を新しく作る"""
+    if not has_strategy(name):
+        raise ValueError(f"Unknown strategy: {name}")
+    factory = _factories[name]
+    if isinstance(factory, str):
+        factory = _factories[name] = resolve_name(factory)
+    return factory()
+
+
+@cache
+def get_strategy(name: str) -> "BasePlayerStrategy":
+    """プロセスの中で使い回す、名前ごとに1つの戦略"""
+    return create_strategy(name)
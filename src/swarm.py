@@ -0,0 +1,350 @@
+from time import perf_counter
+from typing import Iterator, Mapping, Sequence, overload
+
+import numpy as np
+
+from src.bullets import BulletStore
+from src.enemy import InvaderEnemy
+from src.stage import InvaderStage
+from src.type.abstracts import BaseEnemy, StageSnapshot, allocate_enemy_ids
+
+# 方向はコードで持つ
+LEFT, RIGHT, DOWN = 0, 1, 2
+DIRECTIONS = ("left", "right", "down")
+# キーフレームの敵1体分(ENEMY_RECORDと同じ並び。向きのコードもENEMY_DIRECTIONSと同じ)
+ENEMY_RECORD_DTYPE = np.dtype(
+    [("x", "<i4"), ("y", "<i4"), ("direction", "u1"), ("moved_count", "<i4"), ("hitpoint", "<i4")]
+)
+
+
+class SwarmEnemy(InvaderEnemy):
+    """群れの1体分のビュー。生成した時点の値のコピーで、動かしても群れには反映されない"""
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        enemy_id: int,
+        x_position: int,
+        y_position: int,
+        move_direction: int,
+        moved_count: int,
+        hitpoint: int,
+    ) -> None:
+        # idの確保や乱数の消費をしないようにsuper().__init__()は呼ばない
+        self.id = enemy_id
+        self.moved_count = moved_count
+        self.hitpoint = hitpoint
+        self.position = (x_position, y_position)
+        self.move_direction = DIRECTIONS[move_direction]  # type: ignore[assignment]
+
+
+class SwarmEnemies(Sequence[BaseEnemy]):
+    """ステージの配列をBaseEnemyの列として見せるやつ"""
+
+    def __init__(self, stage: "SwarmInvaderStage") -> None:
+        self._stage = stage
+
+    def __len__(self) -> int:
+        return len(self._stage.x)
+
+    @overload
+    def __getitem__(self, index: int) -> BaseEnemy: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[BaseEnemy]: ...
+
+    def __getitem__(self, index: int | slice) -> BaseEnemy | list[BaseEnemy]:
+        if isinstance(index, slice):
+            return [self._stage.enemy_view(i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("swarm index out of range")
+        return self._stage.enemy_view(index)
+
+    def __iter__(self) -> Iterator[BaseEnemy]:
+        stage = self._stage
+        columns = zip(
+            stage.ids.tolist(),
+            stage.x.tolist(),
+            stage.y.tolist(),
+            stage.direction.tolist(),
+            stage.moved_count.tolist(),
+            stage.hitpoint.tolist(),
+        )
+        for enemy_id, x, y, direction, moved_count, hitpoint in columns:
+            yield SwarmEnemy(enemy_id, x, y, direction, moved_count, hitpoint)
+
+
+class SwarmEnemyIndex(Mapping[int, BaseEnemy]):
+    """id→敵の索引。idは昇順に割り当てられ、撃破で詰めても順番は変わらないので二分探索で引ける"""
+
+    def __init__(self, stage: "SwarmInvaderStage") -> None:
+        self._stage = stage
+
+    def __len__(self) -> int:
+        return len(self._stage.ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._stage.ids.tolist())
+
+    def __getitem__(self, enemy_id: int) -> BaseEnemy:
+        ids = self._stage.ids
+        index = int(ids.searchsorted(enemy_id))
+        if index >= len(ids) or ids[index] != enemy_id:
+            raise KeyError(enemy_id)
+        return self._stage.enemy_view(index)
+
+
+class SwarmInvaderStage(InvaderStage):
+    """敵をNumPy配列(struct of arrays)で持ち、1フレームを一括で更新するInvaderStage"""
+
+    name = "Invader Stage (Swarm)"
+    description = "Invader stage backed by NumPy arrays for huge swarms."
+
+    move_count = InvaderEnemy.move_count
+    hitpoint_max = 10
+    base_score = InvaderEnemy.base_score
+
+    def enemy_initialization(self) -> Sequence[BaseEnemy]:
+        positions = self._enemy_positions()
+        count = len(positions)
+        # InvaderStageと同じ順番で乱数を使うので、同じシードなら同じ盤面になる
+        directions = np.unpackbits(
+            np.frombuffer(self._enemy_directions(count), dtype=np.uint8), count=count, bitorder="little"
+        ).astype(np.int8)
+
+        self._set_arrays(
+            np.fromiter((x for x, _ in positions), dtype=np.int64, count=count),
+            np.fromiter((y for _, y in positions), dtype=np.int64, count=count),
+            directions,
+            np.zeros(count, dtype=np.int64),
+            np.full(count, self.hitpoint_max, dtype=np.int64),
+        )
+
+        return SwarmEnemies(self)
+
+    def load_state(
+        self,
+        enemies: Sequence[BaseEnemy],
+        bullets: Sequence[tuple[int, int]],
+        scores: Sequence[int],
+    ) -> None:
+        self._set_arrays(
+            np.array([enemy.position[0] for enemy in enemies], dtype=np.int64),
+            np.array([enemy.position[1] for enemy in enemies], dtype=np.int64),
+            np.array([DIRECTIONS.index(enemy.move_direction) for enemy in enemies], dtype=np.int8),
+            np.array([enemy.moved_count for enemy in enemies], dtype=np.int64),
+            np.array([enemy.hitpoint for enemy in enemies], dtype=np.int64),
+        )
+        self.stage_state["enemies"] = SwarmEnemies(self)
+        self.stage_state["bullets"] = BulletStore(bullets)
+        self.stage_state["scores"] = list(scores)
+        self.stage_state["total_score"] = sum(scores)
+        self._build_enemy_index()
+
+    def pack_enemies(self) -> bytes:
+        # 1体ずつ詰めずに、配列から同じ形式のバイト列を一度に作る
+        records = np.empty(len(self.x), dtype=ENEMY_RECORD_DTYPE)
+        records["x"] = self.x
+        records["y"] = self.y
+        records["direction"] = self.direction
+        records["moved_count"] = self.moved_count
+        records["hitpoint"] = self.hitpoint
+        return records.tobytes()
+
+    def load_packed_state(
+        self,
+        records: bytes,
+        bullets: Sequence[tuple[int, int]],
+        scores: Sequence[int],
+    ) -> None:
+        values = np.frombuffer(records, dtype=ENEMY_RECORD_DTYPE)
+        self._set_arrays(
+            values["x"].astype(np.int64),
+            values["y"].astype(np.int64),
+            values["direction"].astype(np.int8),
+            values["moved_count"].astype(np.int64),
+            values["hitpoint"].astype(np.int64),
+        )
+        self.stage_state["enemies"] = SwarmEnemies(self)
+        self.stage_state["bullets"] = BulletStore(bullets)
+        self.stage_state["scores"] = list(scores)
+        self.stage_state["total_score"] = sum(scores)
+        self._build_enemy_index()
+
+    def snapshot(self) -> StageSnapshot:
+        return (
+            self.x.copy(),
+            self.y.copy(),
+            self.direction.copy(),
+            self.moved_count.copy(),
+            self.hitpoint.copy(),
+            self.ids.copy(),
+            tuple(self.stage_state["bullets"]),
+            tuple(self.stage_state["scores"]),
+            self.stage_state["total_score"],
+        )
+
+    def restore(self, snapshot: StageSnapshot) -> None:
+        x, y, direction, moved_count, hitpoint, ids, bullets, scores, total_score = snapshot
+        # 配列はその後の更新で書き換わるので、スナップショット側を残すためにコピーする
+        self.x = x.copy()
+        self.y = y.copy()
+        self.direction = direction.copy()
+        self.moved_count = moved_count.copy()
+        self.hitpoint = hitpoint.copy()
+        self.ids = ids
+        self.stage_state["enemies"] = SwarmEnemies(self)
+        self.stage_state["bullets"] = BulletStore(bullets)
+        self.stage_state["scores"] = list(scores)
+        self.stage_state["total_score"] = total_score
+        self._build_enemy_index()
+
+    def _set_arrays(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        direction: np.ndarray,
+        moved_count: np.ndarray,
+        hitpoint: np.ndarray,
+    ) -> None:
+        self.x = x
+        self.y = y
+        self.direction = direction
+        self.moved_count = moved_count
+        self.hitpoint = hitpoint
+        first_id = allocate_enemy_ids(len(x))
+        self.ids = np.arange(first_id, first_id + len(x), dtype=np.int64)
+
+    def _build_enemy_index(self) -> None:
+        # 配列がそのまま索引なので、見せ方を用意して統計を更新する
+        self.stage_state["enemy_index"] = SwarmEnemyIndex(self)
+        self._update_stats()
+
+    def enemy_view(self, index: int) -> SwarmEnemy:
+        return SwarmEnemy(
+            int(self.ids[index]),
+            int(self.x[index]),
+            int(self.y[index]),
+            int(self.direction[index]),
+            int(self.moved_count[index]),
+            int(self.hitpoint[index]),
+        )
+
+    def enemies_in_area(self, x_range: range, y_range: range) -> Iterator[BaseEnemy]:
+        inside = (
+            (self.x >= x_range.start) & (self.x < x_range.stop)
+            & (self.y >= y_range.start) & (self.y < y_range.stop)
+        )
+        for index in np.flatnonzero(inside).tolist():
+            yield self.enemy_view(index)
+
+    def enemy_density(self, columns: int, rows: int) -> list[list[int]]:
+        width, height = self.stage_state["screen_size"]
+        column = np.clip(self.x * columns // width, 0, columns - 1)
+        row = np.clip((height - self.y) * rows // height, 0, rows - 1)
+        return np.bincount(row * columns + column, minlength=rows * columns).reshape(rows, columns).tolist()
+
+    def _update_stats(self) -> None:
+        self.stage_state["enemy_count"] = len(self.y)
+        self.stage_state["lowest_enemy_y"] = int(self.y.min()) if len(self.y) else 0
+
+    def emuration_step(self) -> list[tuple[BaseEnemy, int]]:
+        destoroyed_enemys: list[tuple[BaseEnemy, int]] = []
+        width, height = self.stage_state["screen_size"]
+        x, y, direction = self.x, self.y, self.direction
+        profiler = self.profiler
+        if profiler is not None:
+            started = perf_counter()
+
+        # 敵の移動(全員分を一括で)
+        self.moved_count += 1
+        moving = self.moved_count % self.move_count == 0
+        if moving.any():
+            left = moving & (direction == LEFT)
+            right = moving & (direction == RIGHT)
+            down = moving & (direction == DOWN)
+            move_left = left & (x > 0)
+            move_right = right & (x < width - 1)
+
+            x -= move_left
+            x += move_right
+            direction[(left & ~move_left) | (right & ~move_right)] = DOWN
+            y -= down
+            direction[down] = np.where(x[down] > width // 2, LEFT, RIGHT)
+            self._update_stats()
+
+        if profiler is not None:
+            moved = perf_counter()
+            profiler.record("enemy_move", moved - started)
+            profiler.count("enemies_moved", len(x))
+            profiler.count("bullets_moved", len(self.stage_state["bullets"]))
+
+        # 弾の移動と敵への命中判定(当たる可能性のある弾だけを見る)
+        killed: list[int] = []
+        bullets = self.stage_state["bullets"]
+        hitpoint = self.hitpoint
+        candidates = bullets.advance(height, self.stage_state["lowest_enemy_y"]) if len(x) else []
+        if candidates:
+            # 弾ごとに、同じマスにいる敵の候補(ソート済みキー上の開始位置)を一括で求める
+            keys = y * width + x
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            bullet_keys = np.array([bullet_y * width + bullet_x for bullet_x, bullet_y in candidates], dtype=np.int64)
+            found = np.searchsorted(sorted_keys, bullet_keys)
+            matched = sorted_keys[np.minimum(found, len(sorted_keys) - 1)] == bullet_keys
+
+            for bullet, key, index in zip(candidates, bullet_keys.tolist(), np.where(matched, found, -1).tolist()):
+                if index < 0:
+                    continue
+
+                # 同じマスにいる敵のうち、生きていてリストで先にいるものに当たる
+                hit = -1
+                while index < len(sorted_keys) and sorted_keys[index] == key:
+                    if hitpoint[order[index]] > 0:
+                        hit = int(order[index])
+                        break
+                    index += 1
+                if hit < 0:
+                    continue
+
+                # 命中した場合、弾を消して敵の体力を減少させる
+                bullets.remove(bullet)
+                hitpoint[hit] -= 10
+
+                if hitpoint[hit] <= 0:
+                    killed.append(hit)
+
+        if profiler is not None:
+            collided = perf_counter()
+            profiler.record("collision", collided - moved)
+
+        # 撃破した順にスコアを計算する
+        for index in killed:
+            enemy = self.enemy_view(index)
+
+            score = self.emuration_calculate_score(enemy)
+
+            self.stage_state["scores"].append(score)
+            self.stage_state["total_score"] += score
+
+            destoroyed_enemys.append((enemy, score))
+
+        # 撃破された敵をまとめて配列から取り除く
+        if destoroyed_enemys:
+            alive = hitpoint > 0
+            self.x = self.x[alive]
+            self.y = self.y[alive]
+            self.direction = self.direction[alive]
+            self.moved_count = self.moved_count[alive]
+            self.hitpoint = self.hitpoint[alive]
+            self.ids = self.ids[alive]
+            self._update_stats()
+
+        if profiler is not None:
+            profiler.record("scoring", perf_counter() - collided)
+            profiler.count("enemies_destroyed", len(destoroyed_enemys))
+
+        return destoroyed_enemys
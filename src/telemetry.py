@@ -0,0 +1,122 @@
+import csv
+import gzip
+import json
+from queue import Full, Queue
+from threading import Thread
+from typing import IO, TypedDict
+
+from src.game import GameModel
+from src.type.abstracts import BaseEnemy
+from src.type.constants import PLAYER_ACTIONS
+
+
+class StepRecord(TypedDict):
+    seed: int
+    step: int
+    action: PLAYER_ACTIONS
+    enemies: int
+    bullets: int
+    score_delta: int
+    lowest_enemy_y: int
+    # [x, y, スコア]のリスト
+    destroyed: list[list[int]]
+
+
+# ステップのフックではタプルのまま積み、辞書や文字列にするのは書き出しスレッドでやる
+_RawRecord = tuple[int, int, PLAYER_ACTIONS, int, int, int, int, tuple[tuple[int, int, int], ...]]
+
+
+class TelemetrySink:
+    """GameModelのステップフックとして、1ステップごとの記録をファイルに流す。
+
+    記録はbatch_size件ずつまとめて上限付きのキューに入れ、バックグラウンドのスレッドが書き出す。
+    キューがいっぱいのとき(書き込みが追いつかないとき)はシミュレーションを待たせずにまとめて捨て、droppedに数える。
+    パスが.csv(.csv.gz)ならCSV、それ以外はJSON Linesで、.gzで終わるならgzipで圧縮する。
+    """
+
+    def __init__(self, path: str, batch_size: int = 512, max_batches: int = 64, compresslevel: int = 1) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self._batch: list[_RawRecord] = []
+        self._queue: Queue[list[_RawRecord] | None] = Queue(max_batches)
+
+        self._csv = path.removesuffix(".gz").endswith(".csv")
+        # 記録は似た行の繰り返しなので、一番速い圧縮レベルでも十分に縮む
+        self._file: IO[str] = (
+            gzip.open(path, "wt", newline="", compresslevel=compresslevel)
+            if path.endswith(".gz")
+            else open(path, "w", newline="")
+        )
+        self._thread = Thread(target=self._drain, name="telemetry-writer", daemon=True)
+        self._thread.start()
+
+    def attach(self, game: GameModel) -> None:
+        game.step_hooks.append(self.on_step)
+
+    def detach(self, game: GameModel) -> None:
+        game.step_hooks.remove(self.on_step)
+
+    def on_step(self, game: GameModel, action: PLAYER_ACTIONS, destroyed: list[tuple[BaseEnemy, int]]) -> None:
+        stage = game.gamestate["stage"]
+        self._batch.append((
+            game.seed,
+            game.step_count,
+            action,
+            stage["enemy_count"],
+            len(stage["bullets"]),
+            sum(score for _, score in destroyed),
+            stage["lowest_enemy_y"],
+            tuple((*enemy.position, score) for enemy, score in destroyed),
+        ))
+        if len(self._batch) >= self.batch_size:
+            self._submit()
+
+    def _submit(self) -> None:
+        try:
+            self._queue.put_nowait(self._batch)
+        except Full:
+            self.dropped += len(self._batch)
+        self._batch = []
+
+    def close(self) -> None:
+        """残りを書き出して、書き出しスレッドが終わるまで待つ"""
+        if self._batch:
+            # 終わるときだけは待ってでも書く
+            self._queue.put(self._batch)
+            self._batch = []
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _drain(self) -> None:
+        writer = csv.DictWriter(self._file, fieldnames=list(StepRecord.__annotations__)) if self._csv else None
+        if writer is not None:
+            writer.writeheader()
+
+        while (batch := self._queue.get()) is not None:
+            self._write(batch, writer)
+            # 溜まっている分を書き終えたときだけflushする
+            if self._queue.empty():
+                self._file.flush()
+
+    def _write(self, records: list[_RawRecord], writer: csv.DictWriter | None) -> None:
+        rows: list[StepRecord] = [
+            {
+                "seed": seed,
+                "step": step,
+                "action": action,
+                "enemies": enemies,
+                "bullets": bullets,
+                "score_delta": score_delta,
+                "lowest_enemy_y": lowest_enemy_y,
+                "destroyed": [list(enemy) for enemy in destroyed],
+            }
+            for seed, step, action, enemies, bullets, score_delta, lowest_enemy_y, destroyed in records
+        ]
+        if writer is None:
+            self._file.write("".join(json.dumps(row) + "\n" for row in rows))
+        else:
+            writer.writerows({**row, "destroyed": json.dumps(row["destroyed"])} for row in rows)
+        self.written += len(rows)
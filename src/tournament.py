@@ -0,0 +1,170 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import mean
+from time import perf_counter
+from typing import Iterable, Iterator, Sequence, TextIO, TypedDict
+
+from src.game import GameModel
+from src.headless import play_game
+from src.stage import InvaderStage
+from src.strategies import get_strategy
+from src.type.abstracts import BaseGameStage, BasePlayerStrategy
+from src.type.constants import GameState, PLAYER_ACTIONS
+
+
+class TournamentRecord(TypedDict):
+    strategy: str
+    seed: int
+    width: int
+    height: int
+    score: int
+    steps: int
+    cleared: bool
+    decision_time: float
+
+
+class StrategySummary(TypedDict):
+    strategy: str
+    games: int
+    mean_score: float
+    p50_score: int
+    p90_score: int
+    p99_score: int
+    clear_rate: float
+    mean_steps_to_clear: float | None
+    mean_decision_us: float
+
+
+class TimedStrategy(BasePlayerStrategy):
+    """decide_actionにかかった時間を積算するラッパー"""
+
+    def __init__(self, strategy: BasePlayerStrategy) -> None:
+        super().__init__()
+        self.strategy = strategy
+        self.name = strategy.name
+        self.decision_time = 0.0
+
+    def reset(self) -> None:
+        self.decision_time = 0.0
+        self.strategy.reset()
+
+    def decide_action(self, game_state: GameState) -> PLAYER_ACTIONS:
+        started = perf_counter()
+        action = self.strategy.decide_action(game_state)
+        self.decision_time += perf_counter() - started
+        return action
+
+
+# ワーカープロセスごとに盤面サイズ別のGameModelを使い回す
+_games: dict[tuple[type[BaseGameStage], tuple[int, int]], GameModel] = {}
+
+
+def _play(task: tuple[str, int, tuple[int, int], type[BaseGameStage]]) -> TournamentRecord:
+    # 戦略は名前で受け取り、ワーカープロセスの中で1回だけ作って使い回す
+    name, seed, screen_size, stage_class = task
+    strategy = get_strategy(name)
+
+    game = _games.get((stage_class, screen_size))
+    if game is None:
+        game = _games[(stage_class, screen_size)] = GameModel(stage_class(screen_size))
+
+    timed = TimedStrategy(strategy)
+    result = play_game(game, timed, seed)
+
+    return {
+        "strategy": name,
+        "seed": seed,
+        "width": screen_size[0],
+        "height": screen_size[1],
+        "score": result["score"],
+        "steps": result["steps"],
+        "cleared": result["cleared"],
+        "decision_time": timed.decision_time,
+    }
+
+
+def run_tournament(
+    strategies: Sequence[str],
+    seeds: Sequence[int],
+    screen_sizes: Sequence[tuple[int, int]],
+    stage_class: type[BaseGameStage] = InvaderStage,
+    workers: int | None = None,
+) -> Iterator[TournamentRecord]:
+    """全戦略×シード×盤面サイズのゲームをプロセスプールで回す。strategiesは登録されている戦略の名前。
+    結果はタスク順(戦略→盤面サイズ→シード)で返すので、同じ引数なら同じ順・同じ結果になる。
+    """
+    tasks = [
+        (strategy, seed, screen_size, stage_class)
+        for strategy in strategies
+        for screen_size in screen_sizes
+        for seed in seeds
+    ]
+    if not tasks:
+        return
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 8))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_play, tasks, chunksize=chunksize)
+
+
+def summarize_tournament(records: Iterable[TournamentRecord]) -> list[StrategySummary]:
+    by_strategy: dict[str, list[TournamentRecord]] = {}
+    for record in records:
+        by_strategy.setdefault(record["strategy"], []).append(record)
+
+    summaries: list[StrategySummary] = []
+    for name, games in by_strategy.items():
+        scores = sorted(game["score"] for game in games)
+        cleared = [game for game in games if game["cleared"]]
+        steps = sum(game["steps"] for game in games)
+
+        def percentile(p: float) -> int:
+            return scores[min(len(scores) - 1, int(len(scores) * p))]
+
+        summaries.append({
+            "strategy": name,
+            "games": len(games),
+            "mean_score": mean(scores),
+            "p50_score": percentile(0.5),
+            "p90_score": percentile(0.9),
+            "p99_score": percentile(0.99),
+            "clear_rate": len(cleared) / len(games),
+            "mean_steps_to_clear": mean(game["steps"] for game in cleared) if cleared else None,
+            "mean_decision_us": sum(game["decision_time"] for game in games) / steps * 1e6 if steps else 0.0,
+        })
+
+    return summaries
+
+
+def write_report(records: Iterable[TournamentRecord], file: TextIO, report_format: str) -> Iterator[TournamentRecord]:
+    """結果を1ゲームごとにCSVかJSON Linesで書き出しつつ、そのまま流す"""
+    writer = csv.DictWriter(file, fieldnames=list(TournamentRecord.__annotations__)) if report_format == "csv" else None
+    if writer is not None:
+        writer.writeheader()
+
+    for record in records:
+        if writer is not None:
+            writer.writerow(record)
+        else:
+            file.write(json.dumps(record) + "\n")
+        file.flush()
+        yield record
+
+
+def format_summaries(summaries: list[StrategySummary]) -> str:
+    lines = []
+    for summary in summaries:
+        steps_to_clear = summary["mean_steps_to_clear"]
+        lines.append(
+            f"{summary['strategy']}: games={summary['games']} "
+            f"score mean={summary['mean_score']:.1f} p50={summary['p50_score']} "
+            f"p90={summary['p90_score']} p99={summary['p99_score']} "
+            f"clear={summary['clear_rate']:.1%} "
+            f"steps_to_clear={'-' if steps_to_clear is None else f'{steps_to_clear:.1f}'} "
+            f"decision={summary['mean_decision_us']:.1f}us/step"
+        )
+    return "\n".join(lines)
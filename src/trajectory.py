@@ -0,0 +1,180 @@
+from functools import lru_cache
+
+
+def _move_event(x: int, direction: str, width: int) -> tuple[int, str, int]:
+    """InvaderEnemy._moveと同じ1回分の移動。返り値は移動後のx, 方向, 降下量"""
+    match direction:
+        case "left":
+            if x > 0:
+                return x - 1, direction, 0
+            return x, "down", 0
+        case "right":
+            if x < width - 1:
+                return x + 1, direction, 0
+            return x, "down", 0
+        case _:
+            return x, "left" if x > width // 2 else "right", 1
+
+
+class TrajectoryTable:
+    """盤面の幅ごとに、インベーダーの移動(左右往復と降下)の周期を前計算したもの。
+
+    (0, "right")から移動を繰り返すと必ず周期に入るので、その列を一度だけ作っておき、
+    任意の状態からn回移動した後のx座標と降下量を、列の添字計算だけで求められるようにする。
+    """
+
+    def __init__(self, width: int) -> None:
+        self.width = width
+        self.xs: list[int] = []
+        self.index: dict[tuple[int, str], int] = {}
+        # downs[i]は列の先頭からi回移動するまでの降下量の累計
+        self.downs = [0]
+
+        state = (0, "right")
+        while state not in self.index:
+            self.index[state] = len(self.xs)
+            self.xs.append(state[0])
+            x, direction, dy = _move_event(*state, width)
+            self.downs.append(self.downs[-1] + dy)
+            state = (x, direction)
+
+        self.length = len(self.xs)
+        self.cycle_start = self.index[state]
+        self.period = self.length - self.cycle_start
+        self.cycle_downs = self.downs[self.length] - self.downs[self.cycle_start]
+
+        # next_down[i]は列のi番目から、次に降下するまでの移動回数(降下する移動を含む)
+        # 周期部分は1周では後ろが決まらないので2周分さかのぼる
+        self.next_down = [0] * self.length
+        for i in [*range(self.length - 1, self.cycle_start - 1, -1)] * 2 + [*range(self.cycle_start - 1, -1, -1)]:
+            if self.downs[i + 1] > self.downs[i]:
+                self.next_down[i] = 1
+            else:
+                self.next_down[i] = 1 + self.next_down[i + 1 if i + 1 < self.length else self.cycle_start]
+
+        self._entries: dict[tuple[int, str], tuple[int, list[tuple[int, int]]]] = {}
+
+    def entry(self, x: int, direction: str) -> tuple[int, list[tuple[int, int]]]:
+        """列に合流するまでの道のり(各移動回数でのx, 降下量)と、合流先の添字を返す"""
+        entry = self._entries.get((x, direction))
+        if entry is not None:
+            return entry
+
+        path = [(x, 0)]
+        state = (x, direction)
+        downs = 0
+        while state not in self.index:
+            next_x, next_direction, dy = _move_event(*state, self.width)
+            downs += dy
+            state = (next_x, next_direction)
+            path.append((next_x, downs))
+
+        entry = self._entries[(x, direction)] = (self.index[state], path)
+        return entry
+
+    def advance(self, index: int, moves: int) -> tuple[int, int]:
+        """列のindex番目からmoves回移動した後の添字と、その間の降下量"""
+        target = index + moves
+        if target < self.length:
+            return target, self.downs[target] - self.downs[index]
+
+        cycles, offset = divmod(target - self.cycle_start, self.period)
+        target = self.cycle_start + offset
+        return target, self.downs[target] - self.downs[index] + cycles * self.cycle_downs
+
+
+@lru_cache(maxsize=64)
+def trajectory_table(width: int) -> TrajectoryTable:
+    return TrajectoryTable(width)
+
+
+def _state_at(table: TrajectoryTable, index: int, path: list[tuple[int, int]], moves: int) -> tuple[int, int]:
+    # entry()の道のりからmoves回移動した後の敵のxと降下量
+    if moves < len(path):
+        return path[moves]
+    target, downs = table.advance(index, moves - len(path) + 1)
+    return table.xs[target], path[-1][1] + downs
+
+
+def _next_down(table: TrajectoryTable, index: int, path: list[tuple[int, int]], moves: int) -> int:
+    # moves回移動した後、次に降下するのが何回目の移動か
+    for k in range(moves + 1, len(path)):
+        if path[k][1] > path[moves][1]:
+            return k
+    if moves < len(path):
+        return len(path) - 1 + table.next_down[index]
+    target, _ = table.advance(index, moves - len(path) + 1)
+    return moves + table.next_down[target]
+
+
+def predict_intersection(
+    position: tuple[int, int],
+    direction: str,
+    moved_count: int,
+    move_count: int,
+    player_y: int,
+    screen_size: tuple[int, int],
+) -> tuple[int, int]:
+    """弾がplayer_yから上昇し、敵と同じyに到達する時点の敵xと弾のyを求める。
+    フレームごとにシミュレーションした場合(敵move→弾move→当たり判定)と全く同じ結果を返す。
+    height + 2フレーム以内に交差しなければ、その時点の敵xと弾のyを返す。
+    """
+    width, height = screen_size
+    enemy_x, enemy_y = position
+    table = trajectory_table(width)
+    index, path = table.entry(enemy_x, direction)
+    last_frame = height + 2
+
+    if move_count <= 0:
+        # 動かない敵はそのまま弾が届くかだけ
+        frame = enemy_y - player_y
+        if 1 <= frame <= last_frame:
+            return enemy_x, player_y + frame
+        return enemy_x, player_y + last_frame
+
+    def moves_at(frame: int) -> int:
+        return (moved_count + frame) // move_count - moved_count // move_count
+
+    # 敵のyは降下したときだけ変わるので、降下の間の区間ごとに弾のyと一致するフレームを求める
+    moves = 0
+    downs = 0
+    first_frame = 1
+    while True:
+        down_move = _next_down(table, index, path, moves)
+        down_frame = (moved_count // move_count + down_move) * move_count - moved_count
+        frame = enemy_y - downs - player_y
+        if frame < first_frame:
+            break
+        if frame <= min(down_frame - 1, last_frame):
+            return _state_at(table, index, path, moves_at(frame))[0], player_y + frame
+        if down_frame > last_frame:
+            break
+        moves = down_move
+        downs += 1
+        first_frame = down_frame
+
+    # フォールバック: 交差しない場合は最後のフレームの位置
+    return _state_at(table, index, path, moves_at(last_frame))[0], player_y + last_frame
+
+
+def descent_frames(
+    position: tuple[int, int],
+    direction: str,
+    moved_count: int,
+    move_count: int,
+    screen_size: tuple[int, int],
+    frames: int,
+) -> list[int]:
+    """これからframesフレームの間に敵が降下するフレーム(1始まり)の一覧"""
+    if move_count <= 0:
+        return []
+    table = trajectory_table(screen_size[0])
+    index, path = table.entry(position[0], direction)
+    result: list[int] = []
+    moves = 0
+    while True:
+        moves = _next_down(table, index, path, moves)
+        down_frame = (moved_count // move_count + moves) * move_count - moved_count
+        if down_frame > frames:
+            return result
+        result.append(down_frame)
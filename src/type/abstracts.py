@@ -1,13 +1,36 @@
-from uuid import uuid4
 from abc import ABC, abstractmethod
+from bisect import insort
+from random import Random
 
 
-from typing import Literal
+from time import perf_counter
+from typing import Any, Iterator, Literal, Sequence, TYPE_CHECKING
 
+from src.bullets import BulletStore
 from src.type.constants import GameState, PLAYER_ACTIONS, StageState
 
+if TYPE_CHECKING:
+    from src.profiler import Profiler
+
+
+_next_enemy_id = 0
+
+
+def allocate_enemy_ids(count: int = 1) -> int:
+    """連番の敵idをcount個確保して、先頭のidを返す"""
+    global _next_enemy_id
+    first = _next_enemy_id
+    _next_enemy_id += count
+    return first
+
 
 class BaseEnemy(ABC):
+    # 数千体単位で作り直すので、インスタンスごとの__dict__は持たない。
+    # 移動量やスコアなど全員同じ値のものはサブクラスのクラス属性にする
+    __slots__ = ("id", "moved_count", "hitpoint", "position", "move_direction")
+
+    id: int
+    moved_count: int
     hitpoint: int
     position: tuple[int, int]
     move_direction: Literal["left", "right", "down"]
@@ -16,25 +39,14 @@ class BaseEnemy(ABC):
     base_score: int
     char: str
 
-    _moved_count: int
-    _id: str
-
-    def __init__(self) -> None:
-        self._moved_count = 0
-        self._id = uuid4().hex
-
-    @property
-    def id(self) -> str:
-        return self._id
-
-    @property
-    def moved_count(self) -> int:
-        return self._moved_count
+    def __init__(self, moved_count: int = 0) -> None:
+        self.moved_count = moved_count
+        self.id = allocate_enemy_ids()
 
     def move(self, width: int) -> None:
-        self._moved_count += 1
+        self.moved_count += 1
 
-        if self._moved_count % self.move_count == 0:
+        if self.moved_count % self.move_count == 0:
             self._move(width)
 
     @abstractmethod
@@ -60,73 +72,231 @@ class BasePlayerStrategy(ABC):
 class BaseGameStage(ABC):
     name: str
     description: str
+    # GameModel.set_profiler()で付けたときだけフェーズごとの時間を計測する
+    profiler: "Profiler | None" = None
 
     def __init__(self, screen_size: tuple[int, int]) -> None:
         deadline = 10 if screen_size[1] >= 20 else 7
+        # 盤面を作るときの乱数。GameModel.initialize_game()がシードを入れる
+        # (プロセス全体のrandomを使うと、別のスレッドやサンドボックスの盤面作りで並びがずれる)
+        self.random = Random()
         self.stage_state: StageState = {
             "screen_size": screen_size,
             "deadline": deadline,
             "enemies": [],
             "scores": [],
+            "total_score": 0,
             "max_score": 0,
-            "bullets": []
+            "bullets": BulletStore(),
+            "enemy_count": 0,
+            "lowest_enemy_y": 0,
+            "enemy_index": {},
         }
-        self.stage_reset()
+        # 盤面はGameModel.initialize_game()がシードを入れてからstage_reset()で作る
+        # (ここでも作ると、大きな盤面では捨てるだけの盤面作りに秒単位かかる)
 
     @property
     def is_game_over(self) -> bool:
-        if not self.stage_state["enemies"]:
+        if not self.stage_state["enemy_count"]:
             return True
-        elif any(enemy.position[1] <= self.stage_state["deadline"] for enemy in self.stage_state["enemies"]):
+        elif self.stage_state["lowest_enemy_y"] <= self.stage_state["deadline"]:
             return True
         else:
             return False
 
     def stage_reset(self) -> None:
         self.stage_state["enemies"] = self.enemy_initialization()
+        self._build_enemy_index()
         self.stage_state["bullets"].clear()
-        self.stage_state["max_score"] = max(self.stage_state["max_score"], sum(self.stage_state["scores"]))
+        self.stage_state["max_score"] = max(self.stage_state["max_score"], self.stage_state["total_score"])
         self.stage_state["scores"].clear()
+        self.stage_state["total_score"] = 0
+
+    def load_state(
+        self,
+        enemies: Sequence[BaseEnemy],
+        bullets: Sequence[tuple[int, int]],
+        scores: Sequence[int],
+    ) -> None:
+        """途中の状態(キーフレームなど)からステージを組み立て直す"""
+        self.stage_state["enemies"] = list(enemies)
+        self.stage_state["bullets"] = BulletStore(bullets)
+        self.stage_state["scores"] = list(scores)
+        self.stage_state["total_score"] = sum(scores)
+        self._build_enemy_index()
+
+    def snapshot(self) -> "StageSnapshot":
+        """今の状態の軽いコピー。敵オブジェクトは作り直さず、参照と変わりうる値だけを持つ"""
+        return (
+            tuple(
+                (enemy, enemy.position, enemy.move_direction, enemy.moved_count, enemy.hitpoint)
+                for enemy in self.stage_state["enemies"]
+            ),
+            tuple(self.stage_state["bullets"]),
+            tuple(self.stage_state["scores"]),
+            self.stage_state["total_score"],
+        )
+
+    def restore(self, snapshot: "StageSnapshot") -> None:
+        """snapshot()した時点の状態に戻す。敵オブジェクトはその場で書き戻す"""
+        enemies, bullets, scores, total_score = snapshot
+        for enemy, position, move_direction, moved_count, hitpoint in enemies:
+            enemy.position = position
+            enemy.move_direction = move_direction
+            enemy.moved_count = moved_count
+            enemy.hitpoint = hitpoint
+
+        self.stage_state["enemies"] = [enemy for enemy, *_ in enemies]
+        self.stage_state["bullets"] = BulletStore(bullets)
+        self.stage_state["scores"] = list(scores)
+        self.stage_state["total_score"] = total_score
+        self._build_enemy_index()
 
     def bullet_add(self, position: tuple[int, int]) -> None:
-        self.stage_state["bullets"].append(position)
+        self.stage_state["bullets"].add(position)
+
+    def _build_enemy_index(self) -> None:
+        # 座標→敵のマップ。同じマスに複数の敵がいる場合はリスト順(生成順)で並べる
+        self._enemy_order: dict[BaseEnemy, int] = {}
+        # id→敵の索引(戦略がターゲットをidで引くため)
+        enemy_index: dict[int, BaseEnemy] = {}
+        self._enemy_cells: dict[tuple[int, int], list[BaseEnemy]] = {}
+        # 行ごとの敵の数(一番下の行を追いかけるため)
+        self._enemy_rows: dict[int, int] = {}
+        for order, enemy in enumerate(self.stage_state["enemies"]):
+            self._enemy_order[enemy] = order
+            enemy_index[enemy.id] = enemy
+            self._enemy_cells.setdefault(enemy.position, []).append(enemy)
+            self._enemy_rows[enemy.position[1]] = self._enemy_rows.get(enemy.position[1], 0) + 1
+
+        self._enemy_index = self.stage_state["enemy_index"] = enemy_index
+        self.stage_state["enemy_count"] = len(self._enemy_order)
+        self.stage_state["lowest_enemy_y"] = min(self._enemy_rows, default=0)
+
+    def enemies_in_area(self, x_range: range, y_range: range) -> Iterator[BaseEnemy]:
+        """x_range×y_rangeの範囲にいる敵(画面に映す範囲だけ描くため)"""
+        if len(x_range) * len(y_range) < self.stage_state["enemy_count"]:
+            # 範囲の方が小さいときはマスを引く。敵がいない行は飛ばす
+            for y in y_range:
+                if y not in self._enemy_rows:
+                    continue
+                for x in x_range:
+                    cell = self._enemy_cells.get((x, y))
+                    if cell is not None:
+                        yield from cell
+        else:
+            for enemy in self.stage_state["enemies"]:
+                if enemy.position[0] in x_range and enemy.position[1] in y_range:
+                    yield enemy
+
+    def enemy_density(self, columns: int, rows: int) -> list[list[int]]:
+        """盤面をcolumns×rowsに区切った区画ごとの敵の数(ミニマップ用)。rows[0]が盤面の一番上"""
+        width, height = self.stage_state["screen_size"]
+        density = [[0] * columns for _ in range(rows)]
+        # 敵は盤面の外に出ないので、座標から区画への変換は表を引くだけにする
+        column_of = [x * columns // width for x in range(width)]
+        row_of = [min(rows - 1, (height - y) * rows // height) for y in range(height + 1)]
+        for (x, y), cell in self._enemy_cells.items():
+            density[row_of[y]][column_of[x]] += len(cell)
+        return density
+
+    def _enemy_cell_add(self, enemy: BaseEnemy) -> None:
+        cell = self._enemy_cells.get(enemy.position)
+        if cell is None:
+            self._enemy_cells[enemy.position] = [enemy]
+        else:
+            insort(cell, enemy, key=self._enemy_order.__getitem__)
+
+    def _enemy_cell_remove(self, enemy: BaseEnemy, position: tuple[int, int]) -> None:
+        cell = self._enemy_cells[position]
+        if len(cell) == 1:
+            del self._enemy_cells[position]
+        else:
+            cell.remove(enemy)
+
+    def _enemy_row_add(self, y: int) -> None:
+        self._enemy_rows[y] = self._enemy_rows.get(y, 0) + 1
+        if y < self.stage_state["lowest_enemy_y"]:
+            self.stage_state["lowest_enemy_y"] = y
+
+    def _enemy_row_remove(self, y: int) -> None:
+        if self._enemy_rows[y] > 1:
+            self._enemy_rows[y] -= 1
+            return
+
+        del self._enemy_rows[y]
+        if y == self.stage_state["lowest_enemy_y"]:
+            # 一番下の行が空いたときだけ探し直す(行数は画面の高さ分しかない)
+            self.stage_state["lowest_enemy_y"] = min(self._enemy_rows, default=0)
 
     def emuration_step(self) -> list[tuple[BaseEnemy, int]]:
         destoroyed_enemys: list[tuple[BaseEnemy, int]] = []
+        enemy_cells = self._enemy_cells
+        profiler = self.profiler
+        if profiler is not None:
+            started = perf_counter()
 
         # 敵の移動
         for enemy in self.stage_state["enemies"]:
+            position = enemy.position
             enemy.move(self.stage_state["screen_size"][0])
-
-        # 弾の移動と敵への命中判定
-        new_bullets = []
-        for bullet in self.stage_state["bullets"]:
-            new_bullet_y = bullet[1] + 1
-
-            if new_bullet_y >= self.stage_state["screen_size"][1] + 1:
-                # 画面外に出た弾は削除
+            if enemy.position != position:
+                self._enemy_cell_remove(enemy, position)
+                self._enemy_cell_add(enemy)
+                if enemy.position[1] != position[1]:
+                    self._enemy_row_add(enemy.position[1])
+                    self._enemy_row_remove(position[1])
+
+        if profiler is not None:
+            moved = perf_counter()
+            profiler.record("enemy_move", moved - started)
+            profiler.count("enemies_moved", len(self.stage_state["enemies"]))
+            profiler.count("bullets_moved", len(self.stage_state["bullets"]))
+
+        # 弾の移動と敵への命中判定(当たる可能性のある弾だけを見る)
+        killed: list[BaseEnemy] = []
+        bullets = self.stage_state["bullets"]
+        candidates = bullets.advance(self.stage_state["screen_size"][1], self.stage_state["lowest_enemy_y"])
+        for bullet in candidates:
+            cell = enemy_cells.get(bullet)
+            if cell is None:
                 continue
 
-            for enemy_index, enemy in enumerate(self.stage_state["enemies"]):
-                if enemy.position == (bullet[0], new_bullet_y):
-                    # 命中した場合、敵の体力を減少させて消す
-                    enemy.hitpoint -= 10
+            # 命中した場合、弾を消して敵の体力を減少させる
+            bullets.remove(bullet)
+            enemy = cell[0]
+            enemy.hitpoint -= 10
 
-                    if enemy.hitpoint <= 0:
-                        self.stage_state["enemies"].pop(enemy_index)
+            if enemy.hitpoint <= 0:
+                self._enemy_cell_remove(enemy, enemy.position)
+                self._enemy_row_remove(enemy.position[1])
+                del self._enemy_order[enemy]
+                del self._enemy_index[enemy.id]
+                self.stage_state["enemy_count"] -= 1
+                killed.append(enemy)
 
-                        score = self.emuration_calculate_score(enemy)
+        if profiler is not None:
+            collided = perf_counter()
+            profiler.record("collision", collided - moved)
 
-                        self.stage_state["scores"].append(score)
+        # 撃破した順にスコアを計算する
+        for enemy in killed:
+            score = self.emuration_calculate_score(enemy)
 
-                        destoroyed_enemys.append((enemy, score))
+            self.stage_state["scores"].append(score)
+            self.stage_state["total_score"] += score
 
-                    break
-            else:
-                # 命中しなかった弾は次の位置に移動
-                new_bullets.append((bullet[0], new_bullet_y))
+            destoroyed_enemys.append((enemy, score))
 
-        self.stage_state["bullets"] = new_bullets
+        # 撃破された敵をまとめてリストから取り除く
+        if destoroyed_enemys:
+            self.stage_state["enemies"] = [
+                enemy for enemy in self.stage_state["enemies"] if enemy in self._enemy_order
+            ]
+
+        if profiler is not None:
+            profiler.record("scoring", perf_counter() - collided)
+            profiler.count("enemies_destroyed", len(destoroyed_enemys))
 
         return destoroyed_enemys
 
@@ -139,5 +309,9 @@ class BaseGameStage(ABC):
         return enemy.base_score + bonus_score
 
     @abstractmethod
-    def enemy_initialization(self) -> list[BaseEnemy]:
+    def enemy_initialization(self) -> Sequence[BaseEnemy]:
         raise NotImplementedError
+
+
+# ステージのスナップショット。中身はステージの実装ごとに違うので、restore()にそのまま渡すだけにする
+StageSnapshot = tuple[Any, ...]
@@ -1,14 +1,30 @@
 
-from typing import Literal, TypedDict, TYPE_CHECKING
+from typing import Literal, Mapping, Sequence, TypedDict, TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from src.bullets import BulletStore
     from src.type.abstracts import BaseEnemy
 
 
 PLAYER_ACTIONS = Literal["left", "right", "shoot", "none"]
 
+# リプレイなどで行動を2bitで持つときのコード
+ACTIONS_BY_CODE: tuple[PLAYER_ACTIONS, ...] = ("none", "left", "right", "shoot")
+ACTION_CODES: dict[PLAYER_ACTIONS, int] = {action: code for code, action in enumerate(ACTIONS_BY_CODE)}
+
 KEY_Q = 113
 KEY_LOWQ = 81
+KEY_P = 112
+KEY_LOWP = 80
+KEY_SPACE = 32
+KEY_N = 110
+KEY_LOWN = 78
+KEY_T = 116
+KEY_LOWT = 84
+KEY_COMMA = 44
+KEY_PERIOD = 46
+KEY_LESS = 60
+KEY_GREATER = 62
 
 
 class PlayerState(TypedDict):
@@ -19,10 +35,17 @@ class PlayerState(TypedDict):
 class StageState(TypedDict):
     screen_size: tuple[int, int]
     deadline: int
-    enemies: list["BaseEnemy"]
+    enemies: Sequence["BaseEnemy"]
     scores: list[int]
+    total_score: int
     max_score: int
-    bullets: list[tuple[int, int]]
+    # 弾の位置(x, y)の列
+    bullets: "BulletStore"
+    # 敵の移動・撃破のたびに更新される統計(毎回数え直さなくていいように)
+    enemy_count: int
+    lowest_enemy_y: int
+    # id→敵の索引
+    enemy_index: Mapping[int, "BaseEnemy"]
 
 
 class GameState(TypedDict):
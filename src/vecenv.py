@@ -0,0 +1,134 @@
+from typing import Any, Sequence, TypedDict
+
+import numpy as np
+
+from src.game import GameModel
+from src.stage import InvaderStage
+from src.type.abstracts import BaseGameStage
+from src.type.constants import ACTIONS_BY_CODE, GameState
+
+
+class Observation(TypedDict):
+    # 自機のx座標 [K]
+    player_x: np.ndarray
+    # マスごとの敵の数 [K, 高さ, 幅]。行0が盤面の一番上
+    enemies: np.ndarray
+    # マスごとの弾の数 [K, 高さ, 幅]
+    bullets: np.ndarray
+
+
+def empty_observation(num_envs: int, screen_size: tuple[int, int]) -> Observation:
+    width, height = screen_size
+    return {
+        "player_x": np.zeros(num_envs, dtype=np.int32),
+        "enemies": np.zeros((num_envs, height, width), dtype=np.uint8),
+        "bullets": np.zeros((num_envs, height, width), dtype=np.uint8),
+    }
+
+
+def write_observation(observation: Observation, index: int, game_state: GameState) -> None:
+    """observationのindex番目に1ゲーム分の状態を書く"""
+    width, height = game_state["stage"]["screen_size"]
+    observation["player_x"][index] = game_state["player"]["position"][0]
+
+    enemies = observation["enemies"][index]
+    enemies.fill(0)
+    positions = game_state["stage"]["enemies"]
+    if positions:
+        xs = np.fromiter((enemy.position[0] for enemy in positions), dtype=np.intp, count=len(positions))
+        rows = height - np.fromiter((enemy.position[1] for enemy in positions), dtype=np.intp, count=len(positions))
+        np.add.at(enemies, (rows, xs), 1)
+
+    bullets = observation["bullets"][index]
+    bullets.fill(0)
+    # 画面の一番上(y == height)まで来た弾は次のステップで消えるが、それまでは見えるようにする
+    visible = [(height - y, x) for x, y in game_state["stage"]["bullets"] if 0 < y <= height]
+    if visible:
+        rows, xs = zip(*visible)
+        np.add.at(bullets, (np.array(rows), np.array(xs)), 1)
+
+
+def observe(game_state: GameState) -> Observation:
+    """1ゲーム分の観測(K=1)。学習した戦略がdecide_action()の中で使う用"""
+    observation = empty_observation(1, game_state["stage"]["screen_size"])
+    write_observation(observation, 0, game_state)
+    return observation
+
+
+class VecInvaderEnv:
+    """K個のGameModelを足並みをそろえて進める、gym風のベクトル化環境。
+
+    行動はACTIONS_BY_CODEのコード(0: none, 1: left, 2: right, 3: shoot)をK個まとめて渡す。
+    報酬はそのステップで増えたスコアで、終わったゲームはその場で次のシードで始め直す。
+    シードはseedから順番に使うので、同じseedなら同じ行動列に対して同じ結果になる
+    (作った直後もreset()した後と同じ盤面から始まる)。
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        screen_size: tuple[int, int] = (80, 24),
+        stage_class: type[BaseGameStage] = InvaderStage,
+        seed: int = 0,
+    ) -> None:
+        self.num_envs = num_envs
+        self.screen_size = screen_size
+        self._seed = seed
+        # reset()と同じシードで盤面を作っておく(reset()より前にstep()しても再現できるように)
+        self.games = [GameModel(stage_class(screen_size), seed + index) for index in range(num_envs)]
+        self._next_seed = seed + num_envs
+        self._observation = empty_observation(num_envs, screen_size)
+
+    def reset(self, seed: int | None = None) -> Observation:
+        if seed is not None:
+            self._seed = seed
+        self._next_seed = self._seed
+        for game in self.games:
+            self._start(game)
+        return self._observe()
+
+    def step(
+        self, actions: Sequence[int] | np.ndarray
+    ) -> tuple[Observation, np.ndarray, np.ndarray, list[dict[str, Any]]]:
+        """全ゲームを1ステップ進めて(観測, 報酬, 終了したか, 情報)を返す。
+        終了したゲームの情報には最終スコアなどが入り、観測は始め直したゲームのものになる。
+        """
+        if len(actions) != self.num_envs:
+            raise ValueError(f"Expected {self.num_envs} actions, got {len(actions)}.")
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=np.bool_)
+        infos: list[dict[str, Any]] = [{} for _ in range(self.num_envs)]
+
+        for index, (game, code) in enumerate(zip(self.games, np.asarray(actions).tolist())):
+            stage_state = game.gamestate["stage"]
+            before = stage_state["total_score"]
+            game.step(ACTIONS_BY_CODE[code])
+            rewards[index] = stage_state["total_score"] - before
+
+            if game.is_game_over:
+                dones[index] = True
+                infos[index] = {
+                    "seed": game.seed,
+                    "score": stage_state["total_score"],
+                    "steps": game.step_count,
+                    "cleared": not stage_state["enemy_count"],
+                }
+                self._start(game)
+
+        return self._observe(), rewards, dones, infos
+
+    def _start(self, game: GameModel) -> None:
+        game.initialize_game(self._next_seed)
+        self._next_seed += 1
+
+    def _observe(self) -> Observation:
+        observation = self._observation
+        for index, game in enumerate(self.games):
+            write_observation(observation, index, game.gamestate)
+        # 次のステップで書き換えるので、呼び出し側にはコピーを渡す
+        return {
+            "player_x": observation["player_x"].copy(),
+            "enemies": observation["enemies"].copy(),
+            "bullets": observation["bullets"].copy(),
+        }
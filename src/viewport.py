@@ -0,0 +1,45 @@
+class Viewport:
+    """盤面のうち画面に映す範囲。
+
+    盤面が画面より大きいときは、横は自機を追いかけ、縦はscroll()で動かす。
+    盤面と画面が同じ大きさならGameModel.screen_reverser()と同じ変換になる。
+    """
+
+    def __init__(self, board_size: tuple[int, int], view_size: tuple[int, int]) -> None:
+        self.board_size = board_size
+        self.view_size = view_size
+        # 画面の左端に映る盤面のx座標と、画面の一番下より1つ下の盤面のy座標
+        self.left = 0
+        self.bottom = 0
+
+    @property
+    def scrolling(self) -> bool:
+        """盤面が画面に収まらないか"""
+        return self.board_size[0] > self.view_size[0] or self.board_size[1] > self.view_size[1]
+
+    @property
+    def x_range(self) -> range:
+        return range(self.left, self.left + self.view_size[0])
+
+    @property
+    def y_range(self) -> range:
+        return range(self.bottom + 1, self.bottom + self.view_size[1] + 1)
+
+    def follow(self, position: tuple[int, int]) -> None:
+        """自機が横の真ん中に来るように動かす(盤面の端では止まる)"""
+        left = position[0] - self.view_size[0] // 2
+        self.left = max(0, min(left, self.board_size[0] - self.view_size[0]))
+
+    def scroll(self, rows: int) -> bool:
+        """上下に動かす。動いたかどうかを返す"""
+        bottom = max(0, min(self.bottom + rows, self.board_size[1] - self.view_size[1]))
+        moved = bottom != self.bottom
+        self.bottom = bottom
+        return moved
+
+    def to_screen(self, position: tuple[int, int]) -> tuple[int, int] | None:
+        """盤面の座標を画面の座標にする。映っていなければNone"""
+        x, y = position[0] - self.left, self.bottom + self.view_size[1] - position[1]
+        if 0 <= x < self.view_size[0] and 0 <= y < self.view_size[1]:
+            return x, y
+        return None
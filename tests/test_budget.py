@@ -0,0 +1,32 @@
+import pytest
+
+from src.budget import capture_state, restore_state
+from src.game import GameModel
+from src.stage import InvaderStage
+from src.strategies import create_strategy, strategy_names
+
+
+def _stage_classes() -> list[type]:
+    classes: list[type] = [InvaderStage]
+    try:
+        from src.swarm import SwarmInvaderStage
+    except ImportError:
+        pass
+    else:
+        classes.append(SwarmInvaderStage)
+    return classes
+
+
+@pytest.mark.parametrize("stage_class", _stage_classes())
+@pytest.mark.parametrize("name", strategy_names())
+def test_captured_state_gives_same_decisions(stage_class: type, name: str) -> None:
+    """写した盤面を渡した戦略も、元の盤面を渡した戦略と同じ行動を選ぶ"""
+    for seed in range(2):
+        game = GameModel(stage_class((60, 24)), seed)
+        direct, captured = create_strategy(name), create_strategy(name)
+        for _ in range(150):
+            if game.is_game_over:
+                break
+            action = direct.decide_action(game.gamestate)
+            assert captured.decide_action(restore_state(capture_state(game.gamestate))) == action
+            game.step(action)
@@ -0,0 +1,52 @@
+import random
+
+from src.bullets import BulletStore
+
+
+def test_bullet_store_matches_list() -> None:
+    """自機から撃つ普通のプレイでは、毎ステップ作り直すリストと同じ弾が同じ順で当たる"""
+    rng = random.Random(0)
+    for _ in range(20):
+        width, height = rng.randint(1, 30), rng.randint(8, 40)
+        player_y = 6
+        store = BulletStore()
+        bullets: list[tuple[int, int]] = []
+
+        for _ in range(500):
+            if rng.random() < 0.7:
+                bullet = (rng.randrange(width), player_y)
+                store.add(bullet)
+                bullets.append(bullet)
+
+            # マス→そこにいる敵の数(同じマスに複数いれば、上の弾から順に1体ずつ倒す)
+            lowest = rng.randint(player_y, height)
+            cells = {
+                (rng.randrange(width), rng.randint(lowest, height)): rng.randint(1, 2)
+                for _ in range(rng.randint(0, width * 2))
+            }
+            list_cells = dict(cells)
+
+            # 以前の実装: リストの順に1マス上げて、画面外は捨て、敵に当たったら消す
+            list_hits = []
+            new_bullets = []
+            for x, y in bullets:
+                y += 1
+                if y >= height + 1:
+                    continue
+                if list_cells.get((x, y)):
+                    list_cells[(x, y)] -= 1
+                    list_hits.append((x, y))
+                    continue
+                new_bullets.append((x, y))
+            bullets = new_bullets
+
+            store_hits = []
+            for bullet in store.advance(height, min(cells, key=lambda cell: cell[1])[1] if cells else 0):
+                if cells.get(bullet):
+                    cells[bullet] -= 1
+                    store.remove(bullet)
+                    store_hits.append(bullet)
+
+            assert store_hits == list_hits
+            assert len(store) == len(bullets)
+            assert sorted(store) == sorted(bullets)
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from src.game import GameModel
+from src.stage import InvaderStage
+from src.type.constants import ACTIONS_BY_CODE
+
+
+def _board(game: GameModel) -> list:
+    return [(enemy.position, enemy.move_direction) for enemy in game.gamestate["stage"]["enemies"]]
+
+
+def test_initialize_game_does_not_touch_global_random() -> None:
+    random.seed(42)
+    expected = [random.random() for _ in range(3)]
+
+    random.seed(42)
+    game = GameModel(InvaderStage((80, 24)))
+    game.initialize_game(7)
+    assert [random.random() for _ in range(3)] == expected
+
+
+def test_same_seed_gives_same_board() -> None:
+    game = GameModel(InvaderStage((80, 24)))
+    game.initialize_game(7)
+    board = _board(game)
+
+    # 間で別の盤面を作ったり、randomを使ったりしても変わらない
+    GameModel(InvaderStage((80, 24))).initialize_game(8)
+    random.random()
+    game.initialize_game(7)
+    assert _board(game) == board
+
+
+def _stage_classes() -> list:
+    classes: list = [InvaderStage]
+    try:
+        from src.swarm import SwarmInvaderStage
+    except ImportError:
+        pass
+    else:
+        classes.append(SwarmInvaderStage)
+    return classes
+
+
+def _full_state(game: GameModel) -> tuple:
+    stage = game.gamestate["stage"]
+    enemies = [
+        (enemy.id, enemy.position, enemy.move_direction, enemy.moved_count, enemy.hitpoint)
+        for enemy in stage["enemies"]
+    ]
+    index = sorted((enemy_id, enemy.id, enemy.position) for enemy_id, enemy in stage["enemy_index"].items())
+    return (
+        game.step_count,
+        game.gamestate["player"]["position"],
+        game.gamestate["player"]["bullet_cooldown"],
+        enemies,
+        index,
+        sorted(stage["bullets"]),
+        list(stage["scores"]),
+        stage["total_score"],
+        stage["enemy_count"],
+        stage["lowest_enemy_y"],
+    )
+
+
+@pytest.mark.parametrize("stage_class", _stage_classes())
+def test_restore_then_replay_gives_same_state(stage_class: type) -> None:
+    """snapshot()から戻して同じ行動で進めると、idや索引、弾まで同じ状態になる(Lookaheadが頼っている)"""
+    rng = random.Random(1)
+    game = GameModel(stage_class((60, 30)))
+    game.initialize_game(5)
+    for _ in range(40):
+        game.step(ACTIONS_BY_CODE[rng.randrange(4)])
+
+    for _ in range(5):
+        snapshot = game.snapshot()
+        before = _full_state(game)
+        actions = [ACTIONS_BY_CODE[rng.randrange(4)] for _ in range(60)]
+        for action in actions:
+            game.step(action)
+        after = _full_state(game)
+
+        game.restore(snapshot)
+        assert _full_state(game) == before
+        for action in actions:
+            game.step(action)
+        assert _full_state(game) == after
@@ -0,0 +1,82 @@
+import pytest
+
+from src.game import GameModel
+from src.player import PredictStrategy
+from src.stage import InvaderStage
+from src.trajectory import predict_intersection
+from src.type.abstracts import BasePlayerStrategy
+
+
+class _PerFramePredict(BasePlayerStrategy):
+    """計画も索引も使わずに、狙いを選ぶたびに全部の敵を予測し直す以前のPredict"""
+
+    name = "PerFramePredict"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.target_enemy_id: int | None = None
+        self.shots_in_flight: dict[int, int] = {}
+        self.frame = 0
+
+    def decide_action(self, game_state):
+        self.frame += 1
+        player_x, player_y = game_state["player"]["position"]
+        stage = game_state["stage"]
+        screen_size = stage["screen_size"]
+
+        def predict(enemy) -> tuple[int, int]:
+            return predict_intersection(
+                enemy.position, enemy.move_direction, enemy.moved_count, enemy.move_count, player_y, screen_size
+            )
+
+        enemy = None if self.target_enemy_id is None else stage["enemy_index"].get(self.target_enemy_id)
+        if enemy is None:
+            best = None
+            for index, e in enumerate(stage["enemies"]):
+                if self.shots_in_flight.get(e.id, 0) > self.frame:
+                    continue
+                pred_x, pred_y = predict(e)
+                key = (abs(pred_x - player_x), max(0, pred_y - player_y), -e.position[1], index)
+                if best is None or key < best[0]:
+                    best = (key, e)
+            if best is None:
+                return "none"
+            enemy = best[1]
+            self.target_enemy_id = enemy.id
+
+        target_x, bullet_y = predict(enemy)
+        if target_x < player_x:
+            return "left"
+        if target_x > player_x:
+            return "right"
+        if player_x not in (0, screen_size[0] - 1):
+            self.shots_in_flight[enemy.id] = self.frame + bullet_y - player_y + 1
+            self.target_enemy_id = None
+        return "shoot"
+
+
+def _stage_classes() -> list[type]:
+    classes: list[type] = [InvaderStage]
+    try:
+        from src.swarm import SwarmInvaderStage
+    except ImportError:
+        pass
+    else:
+        classes.append(SwarmInvaderStage)
+    return classes
+
+
+@pytest.mark.parametrize("stage_class", _stage_classes())
+# 幅の狭い盤面は敵がすぐ降下するので、撃つと弾が降下とすれ違うフレームも多く通る
+@pytest.mark.parametrize(
+    "screen_size, seeds", [((80, 24), 20), ((200, 60), 3), ((40, 60), 8), ((12, 40), 10), ((7, 20), 20)]
+)
+def test_predict_matches_per_frame_logic(stage_class: type, screen_size: tuple[int, int], seeds: int) -> None:
+    """計画と列の索引を使い回しても、毎フレーム全部の敵から選び直すのと同じ行動になる"""
+    for seed in range(seeds):
+        game = GameModel(stage_class(screen_size), seed)
+        predict, per_frame = PredictStrategy(), _PerFramePredict()
+        while not game.is_game_over and game.step_count < 3000:
+            action = predict.decide_action(game.gamestate)
+            assert action == per_frame.decide_action(game.gamestate), (seed, game.step_count)
+            game.step(action)
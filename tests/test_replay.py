@@ -0,0 +1,75 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.game import GameModel
+from src.replay import ReplayPlayer, ReplayReader, ReplayRecorder, decode_keyframe, encode_keyframe
+from src.rewind import RewindBuffer
+from src.stage import InvaderStage
+from src.type.constants import ACTIONS_BY_CODE
+
+
+def _state(game: GameModel) -> tuple:
+    stage = game.gamestate["stage"]
+    return (
+        game.step_count,
+        game.gamestate["player"]["position"],
+        stage["total_score"],
+        sorted(stage["bullets"]),
+        [(enemy.position, enemy.move_direction, enemy.moved_count, enemy.hitpoint) for enemy in stage["enemies"]],
+    )
+
+
+def test_replay_of_rewound_game_matches_live_game(tmp_path: Path) -> None:
+    """巻き戻してから別の行動で続けたゲームも、リプレイすると実際の盤面と同じになる"""
+    path = tmp_path / "rewound.rep"
+    rng = random.Random(0)
+    game = GameModel(InvaderStage((80, 24)))
+    recorder = ReplayRecorder(open(path, "wb"), keyframe_interval=100)
+    recorder.attach(game)
+    rewind = RewindBuffer(capacity=1000, keyframe_interval=50)
+    rewind.attach(game)
+
+    game.initialize_game(3)
+    # キーフレームをまたいで巻き戻し、2回目は記録の途中(キーフレームの間)まで戻す
+    for steps, seek_to in ((300, 150), (120, 230), (100, None)):
+        for _ in range(steps):
+            game.step(ACTIONS_BY_CODE[rng.randrange(4)])
+        if seek_to is not None:
+            rewind.seek(game, seek_to)
+    assert not game.is_game_over
+    live = _state(game)
+    recorder.close()
+
+    with open(path, "rb") as replay_file:
+        replay = ReplayPlayer(ReplayReader(replay_file))
+        assert replay.length == live[0]
+        replay.seek(replay.length)
+        assert _state(replay.game) == live
+        # キーフレームからシークしても同じになる
+        replay.seek(0)
+        replay.seek(replay.length - 10)
+        replay.seek(replay.length)
+        assert _state(replay.game) == live
+
+
+def test_swarm_keyframes_match_object_keyframes() -> None:
+    """配列から作るキーフレームも、敵オブジェクトから作るものと同じバイト列になり、同じ盤面に戻る"""
+    pytest.importorskip("numpy")
+    from src.swarm import SwarmInvaderStage
+
+    rng = random.Random(1)
+    games = [GameModel(InvaderStage((120, 40)), 4), GameModel(SwarmInvaderStage((120, 40)), 4)]
+    for _ in range(5):
+        actions = [ACTIONS_BY_CODE[rng.randrange(4)] for _ in range(60)]
+        for game in games:
+            for action in actions:
+                game.step(action)
+        keyframes = [encode_keyframe(game) for game in games]
+        assert keyframes[0] == keyframes[1]
+
+        for game in games:
+            before = _state(game)
+            decode_keyframe(game, encode_keyframe(game, 1))
+            assert _state(game) == before
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.game import GameModel
+from src.stage import InvaderStage
+from src.strategies import create_strategy
+from src.swarm import SwarmInvaderStage
+
+
+def _state(game: GameModel) -> tuple:
+    # idは確保した順に振られるのでバックエンド間では比べない
+    stage = game.gamestate["stage"]
+    return (
+        game.gamestate["player"],
+        stage["total_score"],
+        stage["enemy_count"],
+        stage["lowest_enemy_y"],
+        sorted(stage["bullets"]),
+        [(enemy.position, enemy.move_direction, enemy.moved_count, enemy.hitpoint) for enemy in stage["enemies"]],
+    )
+
+
+@pytest.mark.parametrize("strategy_name", ["Predict", "Midareuti"])
+@pytest.mark.parametrize("screen_size", [(80, 24), (40, 12), (21, 30), (120, 40)])
+def test_swarm_matches_object_backend(strategy_name: str, screen_size: tuple[int, int]) -> None:
+    """同じシードと行動なら、NumPyの群れとオブジェクトの敵で毎ステップ同じ盤面になる"""
+    for seed in range(3):
+        games = [GameModel(InvaderStage(screen_size)), GameModel(SwarmInvaderStage(screen_size))]
+        strategies = [create_strategy(strategy_name), create_strategy(strategy_name)]
+        for game, strategy in zip(games, strategies):
+            game.initialize_game(seed)
+            strategy.reset()
+        assert _state(games[0]) == _state(games[1])
+
+        for _ in range(3000):
+            if games[0].is_game_over:
+                break
+            actions = [strategy.decide_action(game.gamestate) for game, strategy in zip(games, strategies)]
+            assert actions[0] == actions[1]
+            destroyed = [
+                [(enemy.position, score) for enemy, score in game.step(actions[0])] for game in games
+            ]
+            assert destroyed[0] == destroyed[1]
+            assert _state(games[0]) == _state(games[1])
+        assert games[1].is_game_over == games[0].is_game_over
@@ -0,0 +1,107 @@
+import random
+
+from src.trajectory import descent_frames, predict_intersection
+
+
+def _simulate_intersection(
+    position: tuple[int, int],
+    direction: str,
+    moved_count: int,
+    move_count: int,
+    player_y: int,
+    screen_size: tuple[int, int],
+) -> tuple[int, int]:
+    """周期表を使う前の、1フレームずつ進める予測(敵move→弾move→当たり判定)"""
+    width, height = screen_size
+    ex, ey = position
+    moved = moved_count
+    bullet_y = player_y
+
+    for _ in range(height + 2):
+        moved += 1
+        if move_count > 0 and moved % move_count == 0:
+            match direction:
+                case "left":
+                    if ex > 0:
+                        ex -= 1
+                    else:
+                        direction = "down"
+                case "right":
+                    if ex < width - 1:
+                        ex += 1
+                    else:
+                        direction = "down"
+                case "down":
+                    ey -= 1
+                    direction = "left" if ex > width // 2 else "right"
+
+        bullet_y += 1
+        if bullet_y == ey:
+            return ex, bullet_y
+
+    return ex, bullet_y
+
+
+def test_predict_intersection_matches_simulation() -> None:
+    rng = random.Random(0)
+    for _ in range(30000):
+        # 端の幅(1, 2)や、負の移動カウント、動かない敵(move_count <= 0)も混ぜる
+        width = rng.choice((1, 2, 3, rng.randint(4, 200)))
+        height = rng.randint(1, 80)
+        state = (
+            (rng.randrange(width), rng.randint(-5, height + 5)),
+            rng.choice(("left", "right", "down")),
+            rng.randint(-10, 10),
+            rng.choice((-1, 0, 1, 2, 3, rng.randint(4, 7))),
+            rng.randint(0, height),
+            (width, height),
+        )
+        assert predict_intersection(*state) == _simulate_intersection(*state), state
+
+
+def _simulate_descents(
+    position: tuple[int, int],
+    direction: str,
+    moved_count: int,
+    move_count: int,
+    screen_size: tuple[int, int],
+    frames: int,
+) -> list[int]:
+    """1フレームずつ敵を動かして、降下したフレームを集める"""
+    width = screen_size[0]
+    ex = position[0]
+    moved = moved_count
+    result = []
+    for frame in range(1, frames + 1):
+        moved += 1
+        if move_count > 0 and moved % move_count == 0:
+            match direction:
+                case "left":
+                    if ex > 0:
+                        ex -= 1
+                    else:
+                        direction = "down"
+                case "right":
+                    if ex < width - 1:
+                        ex += 1
+                    else:
+                        direction = "down"
+                case "down":
+                    result.append(frame)
+                    direction = "left" if ex > width // 2 else "right"
+    return result
+
+
+def test_descent_frames_match_simulation() -> None:
+    rng = random.Random(1)
+    for _ in range(5000):
+        width = rng.choice((1, 2, 3, rng.randint(4, 200)))
+        state = (
+            (rng.randrange(width), rng.randint(0, 100)),
+            rng.choice(("left", "right", "down")),
+            rng.randint(-10, 10),
+            rng.choice((-1, 0, 1, 2, 3, rng.randint(4, 7))),
+            (width, 100),
+            rng.randint(0, 400),
+        )
+        assert descent_frames(*state) == _simulate_descents(*state), state
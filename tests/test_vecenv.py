@@ -0,0 +1,23 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.vecenv import VecInvaderEnv  # noqa: E402
+
+
+def _play(env: VecInvaderEnv, steps: int) -> list:
+    rng = np.random.default_rng(0)
+    results = []
+    for _ in range(steps):
+        observation, rewards, dones, infos = env.step(rng.integers(0, 4, env.num_envs))
+        results.append((observation["player_x"].tolist(), rewards.tolist(), dones.tolist(), infos))
+    return results
+
+
+def test_step_before_reset_is_reproducible() -> None:
+    # 作った直後にstep()しても、reset()してからと同じ結果になる
+    fresh = _play(VecInvaderEnv(3, (40, 20), seed=11), 200)
+    env = VecInvaderEnv(3, (40, 20))
+    env.reset(seed=11)
+    assert fresh == _play(env, 200)
+    assert fresh == _play(VecInvaderEnv(3, (40, 20), seed=11), 200)